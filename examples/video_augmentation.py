@@ -41,10 +41,7 @@ if __name__ == "__main__":
             x, y = None, None
             if ret:
                 frame = np.fliplr(frame).astype(np.uint8)
-                screen_frame = cv2.resize(
-                    cv2.rotate(frame, cv2.ROTATE_90_COUNTERCLOCKWISE),
-                    augmentation.image.get_size()[::-1],
-                )
+                screen_frame = cv2.resize(frame, (WIDTH, HEIGHT))
                 image_rgb = cv2.cvtColor(screen_frame, cv2.COLOR_BGR2RGB)
                 results = hands.process(image_rgb)
 
@@ -74,7 +71,7 @@ if __name__ == "__main__":
                                 np.random.randint(100, HEIGHT),
                             )
                             if (x, y) == (None, None)
-                            else (y, x)
+                            else (x, y)
                         ),
                         particle_property=ParticleProperty(
                             min_lifetime=500,
@@ -1,11 +1,10 @@
-from smokesim.smoke import SmokeMachine
+from smokesim.smoke import SmokeMachine, SmokeBatch
 from smokesim.engine import EngineTypes, Engine
 from smokesim.defs import SmokeProperty
 
-from typing import Optional, Tuple
+from typing import Optional, Sequence, Tuple
 from pathlib import Path
 import numpy as np
-import cv2
 
 
 class Augmentation:
@@ -16,6 +15,8 @@ class Augmentation:
         smoke_machine: Optional[SmokeMachine] = None,
         random_seed: int = 100,
         engine_type: EngineTypes = EngineTypes.PYGAME,
+        offscreen: bool = True,
+        threads: int = 1,
     ):
         """
         Initialize the Augmentation class.
@@ -26,11 +27,15 @@ class Augmentation:
         - smoke_machine (Optional[SmokeMachine], optional): The smoke machine. Defaults to None.
         - random_seed (int, optional): The random seed. Defaults to 100.
         - engine_type (EngineTypes, optional): The engine type. Defaults to EngineTypes.PYGAME.
+        - offscreen (bool, optional): Render pygame without opening a display. Defaults to True.
+        - threads (int, optional): Draw the smoke of the NumPy and OpenCV engines tile by tile on this many threads. Defaults to 1.
         """
         self.image_path = image_path
         self.screen_dim = screen_dim
         self.engine_type = engine_type
-        self.engine = Engine(screen_dim, engine_type)
+        self.engine = Engine(
+            screen_dim, engine_type, offscreen=offscreen, threads=threads
+        )
 
         # Read the image
         self.engine.read_image(image_path)
@@ -46,6 +51,8 @@ class Augmentation:
             else SmokeMachine(self.screen, random_seed=random_seed)
         )
         self.smoke_machine.random_seed = random_seed
+        # Transparent layer the smoke is rendered into once per step
+        self.layer = self.engine.make_layer()
 
         # Display the image
         self.display_image()
@@ -89,15 +96,18 @@ class Augmentation:
         time_step: float,
         image: Optional[np.ndarray] = None,
         history_path: Optional[Path] = None,
+        render_every: int = 1,
     ):
         """
-        A method to augment the image with smoke.
+        A method to augment the image with smoke. Every `render_every`-th step and the last step
+        are rendered, the steps in between are only simulated.
 
         Args:
         - steps (int): The number of steps to augment the image.
         - time_step (float): The time step to augment the image.
         - image (Optional[np.ndarray]): The image to augment.
         - history_path (Path): The path to save the history.
+        - render_every (int, optional): Render one frame every this many steps. Defaults to 1.
 
         Yields:
         - np.ndarray: The augmented image.
@@ -108,6 +118,8 @@ class Augmentation:
 
         self.writer = None
         if history_path:
+            import cv2
+
             self.writer = cv2.VideoWriter(
                 str(history_path),
                 cv2.VideoWriter_fourcc(*"mp4v"),
@@ -115,39 +127,19 @@ class Augmentation:
                 self.screen_dim,
             )
 
+        render_every = max(int(render_every), 1)
         for t in range(steps):
-            # Draw the base image
-            self.engine.blit(self.screen, self.image, (0, 0))
-
-            # Update and draw smoke particles
-            self.smoke_machine.update(time_step=time_step)
-            self.smoke_machine.draw(self.screen, self.engine)
-
-            # Extract the augmented image
-            if self.engine_type == EngineTypes.PYGAME:
-                self.engine.engine.display.flip()
-                rgb_array = self.engine.engine.surfarray.array3d(self.screen)
-                rgb_array = cv2.rotate(rgb_array, cv2.ROTATE_90_CLOCKWISE)
-            elif self.engine_type == EngineTypes.PIL:
-                rgb_array = np.array(self.screen)
-
-            # Clear the screen to black and redraw only the smoke for the mask
-            if self.engine_type == EngineTypes.PYGAME:
-                self.screen.fill((0, 0, 0))  # Clear the screen to black
-            elif self.engine_type == EngineTypes.PIL:
-                self.screen = self.engine.make_screen(
-                    self.screen_dim
-                )  # Create a new black screen
-
-            self.smoke_machine.draw(self.screen, self.engine)
-
-            # Extract the mask as an RGB image
-            if self.engine_type == EngineTypes.PYGAME:
-                self.engine.engine.display.flip()
-                rgb_mask_array = self.engine.engine.surfarray.array3d(self.screen)
-                rgb_mask_array = cv2.rotate(rgb_mask_array, cv2.ROTATE_90_CLOCKWISE)
-            elif self.engine_type == EngineTypes.PIL:
-                rgb_mask_array = np.array(self.screen)
+            if (t + 1) % render_every and t != steps - 1:
+                self.advance(1, time_step)
+                continue
+
+            # Update the smoke and render it once into the transparent layer
+            self.render_step(self.smoke_machine, time_step)
+
+            # Derive the augmented image (smoke over the image) and the mask (smoke over black)
+            rgb_array, rgb_mask_array = self.engine.compose(
+                self.screen, self.layer, self.image
+            )
 
             # Save the mask to the video writer if enabled
             if self.writer:
@@ -156,12 +148,167 @@ class Augmentation:
             # Yield the augmented image and mask
             yield rgb_array, rgb_mask_array
 
+    def advance(
+        self,
+        steps: int = 1,
+        time_step: float = 30,
+        smoke_machine: Optional[SmokeMachine] = None,
+    ):
+        """
+        A method to simulate steps without drawing anything. The particles end up in the same
+        state as if every step had been rendered.
+
+        Args:
+        - steps (int, optional): The number of steps. Defaults to 1.
+        - time_step (float, optional): The time step. Defaults to 30.
+        - smoke_machine (Optional[SmokeMachine], optional): The smoke machine. Defaults to None (the augmentation's).
+        """
+        smoke_machine = smoke_machine or self.smoke_machine
+        for t in range(steps):
+            smoke_machine.update(time_step=time_step)
+            smoke_machine.cull(self.engine.screen_dim)
+
+    def render(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A method to render the current state of the smoke machine over the image.
+
+        Returns:
+        - np.ndarray: The smoke overlayed image.
+        - np.ndarray: The smoke only image.
+        """
+        self.engine.clear_layer(self.layer)
+        self.smoke_machine.draw(self.layer, self.engine, layer=True)
+        return self.engine.compose(self.screen, self.layer, self.image)
+
+    def render_at(
+        self, step: int, time_step: float = 30
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A method to render the smoke machine as it is after `step` steps from its initial
+        state, without simulating the steps before (see `SmokeMachine.render_at`).
+
+        Args:
+        - step (int): The step to render.
+        - time_step (float, optional): The time step of every step. Defaults to 30.
+
+        Returns:
+        - np.ndarray: The smoke overlayed image.
+        - np.ndarray: The smoke only image.
+        """
+        self.engine.clear_layer(self.layer)
+        self.smoke_machine.render_at(
+            step, self.layer, self.engine, time_step=time_step, layer=True
+        )
+        return self.engine.compose(self.screen, self.layer, self.image)
+
+    def render_step(self, smoke_machine: SmokeMachine, time_step: float):
+        """
+        A method to update a smoke machine and render its smoke into the transparent layer.
+
+        Args:
+        - smoke_machine (SmokeMachine): The smoke machine.
+        - time_step (float): The time step to update the smoke machine by.
+        """
+        smoke_machine.update(time_step=time_step)
+        self.engine.clear_layer(self.layer)
+        smoke_machine.draw(self.layer, self.engine, layer=True)
+
+    def augment_batch(
+        self,
+        images: np.ndarray,
+        steps: int = 2,
+        time_step: float = 30,
+        shared: bool = True,
+        random_seeds: Optional[Sequence[int]] = None,
+        chunk_size: int = 16,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A method to augment a batch of images with smoke.
+
+        With `shared`, the smoke machine is advanced once and its smoke is composited over every
+        image. Otherwise every image gets its own copy of the smoke machine, restarted and reseeded
+        from `random_seeds`, and the smoke machine itself is left untouched. The copies are
+        simulated together in one `SmokeBatch`.
+
+        Args:
+        - images (np.ndarray): The (N, H, W, 3) uint8 RGB images. They are resized to the screen dimensions if needed.
+        - steps (int, optional): The number of steps to augment the images. Defaults to 2.
+        - time_step (float, optional): The time step to augment the images. Defaults to 30.
+        - shared (bool, optional): Whether all images share one simulation. Defaults to True.
+        - random_seeds (Optional[Sequence[int]], optional): The N seeds of the independent simulations. Defaults to None (derived from the smoke machine's seed).
+        - chunk_size (int, optional): How many images are composited at once. Defaults to 16.
+
+        Returns:
+        - np.ndarray: The (N, H, W, 3) smoke overlayed images.
+        - np.ndarray: The (N, H, W, 3) smoke only images.
+        """
+        width, height = self.screen_dim
+        images = np.asarray(images, dtype=np.uint8)
+        if images.shape[1:3] != (height, width):
+            import cv2
+
+            images = np.stack([cv2.resize(image, (width, height)) for image in images])
+        aug_images = np.empty_like(images)
+        aug_masks = np.empty_like(images)
+
+        if shared:
+            self.advance(steps - 1, time_step)
+            self.render_step(self.smoke_machine, time_step)
+            self.compose_batch(images, aug_images, aug_masks, chunk_size)
+            return aug_images, aug_masks
+
+        if random_seeds is None:
+            random_seeds = np.random.SeedSequence(
+                self.smoke_machine.random_seed
+            ).generate_state(len(images))
+        if len(random_seeds) != len(images):
+            raise ValueError(
+                f"Expected {len(images)} random seeds, got {len(random_seeds)}."
+            )
+        batch = SmokeBatch(self.smoke_machine, random_seeds)
+        for step in range(steps):
+            batch.update(time_step)
+            if step < steps - 1:
+                batch.cull(self.engine.screen_dim)
+        for i in range(len(images)):
+            self.engine.clear_layer(self.layer)
+            batch.draw(i, self.layer, self.engine, layer=True)
+            self.compose_batch(
+                images[i : i + 1], aug_images[i : i + 1], aug_masks[i : i + 1]
+            )
+        return aug_images, aug_masks
+
+    def compose_batch(
+        self,
+        images: np.ndarray,
+        aug_images: np.ndarray,
+        aug_masks: np.ndarray,
+        chunk_size: int = 16,
+    ):
+        """
+        A method to composite the smoke in the transparent layer over a batch of images.
+
+        Args:
+        - images (np.ndarray): The (N, H, W, 3) uint8 RGB images.
+        - aug_images (np.ndarray): The (N, H, W, 3) uint8 array the smoke overlayed images are written to.
+        - aug_masks (np.ndarray): The (N, H, W, 3) uint8 array the smoke only images are written to.
+        - chunk_size (int, optional): How many images are composited at once. Defaults to 16.
+        """
+        self.engine.compose_batch(
+            self.screen,
+            self.layer,
+            images,
+            out=(aug_images, aug_masks),
+            chunk_size=chunk_size,
+        )
+
     def augment(
         self,
         steps: int = 2,
         time_step: float = 30,
         image: Optional[np.ndarray] = None,
         history_path: Optional[Path] = None,
+        render_every: Optional[int] = None,
     ) -> Tuple[np.ndarray, np.ndarray]:
         """
         A method to augment the image with smoke.
@@ -170,6 +317,8 @@ class Augmentation:
         - steps (int, optional): The number of steps to augment the image. Defaults to 2.
         - time_step (float, optional): The time step to augment the image. Defaults to 30.
         - image (Optional[np.ndarray], optional): The image to augment. Defaults to None.
+        - history_path (Optional[Path], optional): The path to save the history. Defaults to None.
+        - render_every (Optional[int], optional): Render one frame every this many steps. Defaults to None (every step with a history, else only the last one).
 
         Returns:
         - np.ndarray: The smoke overlayed image.
@@ -177,8 +326,10 @@ class Augmentation:
         """
         if image is not None:
             self.image = self.engine.make_surface(image)
+        if render_every is None:
+            render_every = 1 if history_path else steps
         for rgb_array, rgb_mask_array in self.augment_iter(
-            steps, time_step, image, history_path=history_path
+            steps, time_step, history_path=history_path, render_every=render_every
         ):
             pass
         if self.writer:
@@ -193,6 +344,8 @@ class Augmentation:
         Args:
         - out_dir (Path, optional): The output directory to save the image. Defaults to Path('assets/augmented_smoke.png').
         """
+        import cv2
+
         cv2.imwrite(str(out_dir), cv2.cvtColor(self.last_aug_img, cv2.COLOR_RGB2BGR))
         cv2.imwrite(
             str(out_dir.parent / (out_dir.stem + "_mask.png")),
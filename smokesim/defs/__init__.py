@@ -1,2 +1,3 @@
 from .particle import *  # noqa
 from .smoke import *  # noqa
+from .scene import *  # noqa
@@ -2,7 +2,7 @@ from smokesim.base import BaseProperty
 from smokesim.defs.constants import CLOUD_MASK
 
 import numpy as np
-from typing import Optional, Tuple
+from typing import NamedTuple, Optional, Tuple
 
 
 class Sprite(BaseProperty):
@@ -65,3 +65,57 @@ class ParticleProperty(BaseProperty):
     alpha: int = 255
     # seed:int = 100
     id: str = ""
+
+    def compile(self) -> "ParticleSpec":
+        """
+        A method to compile the validated property into a `ParticleSpec` for the simulation.
+
+        Returns:
+        - ParticleSpec: The compiled spec.
+        """
+        return ParticleSpec(
+            startvx=self.startvx,
+            startvy=self.startvy,
+            scale=self.scale,
+            lifetime=self.lifetime,
+            age=self.age,
+            min_vx=float(self.min_vx),
+            max_vx=float(self.max_vx),
+            min_vy=float(self.min_vy),
+            max_vy=float(self.max_vy),
+            min_scale=self.min_scale,
+            max_scale=self.max_scale,
+            scale_range=tuple(self.scale_range),
+            min_lifetime=float(self.min_lifetime),
+            max_lifetime=float(self.max_lifetime),
+            color=tuple(self.color),
+            smoke_sprite_size=self.smoke_sprite_size,
+            fade_speed=self.fade_speed,
+            alpha=self.alpha,
+        )
+
+
+class ParticleSpec(NamedTuple):
+    """
+    An immutable, validation-free copy of a `ParticleProperty` that particles are spawned from.
+    Make it with `ParticleProperty.compile`.
+    """
+
+    startvx: Optional[float]
+    startvy: Optional[float]
+    scale: Optional[float]
+    lifetime: Optional[int]
+    age: int
+    min_vx: float
+    max_vx: float
+    min_vy: float
+    max_vy: float
+    min_scale: int
+    max_scale: int
+    scale_range: Tuple[float, float]
+    min_lifetime: float
+    max_lifetime: float
+    color: Tuple[float, float, float]
+    smoke_sprite_size: int
+    fade_speed: int
+    alpha: int
@@ -0,0 +1,32 @@
+from smokesim.defs.particle import ParticleProperty
+from smokesim.defs.smoke import SmokeProperty
+from smokesim.base import BaseProperty
+
+from typing import List, Optional, Tuple
+
+
+class SceneProperty(BaseProperty):
+    """
+    A dataclass to represent the parameters of a generated smoke scene. Ranges are inclusive and
+    every sample draws its own values from them.
+
+    - steps (Tuple[int, int], optional): The range of simulation steps. Defaults to (30, 90).
+    - time_step (float, optional): The time step of the simulation. Defaults to 30.
+    - smoke_count (Tuple[int, int], optional): The range of random smokes per scene. Defaults to (1, 5).
+    - particle_count (Tuple[int, int], optional): The range of particles per emission of a random smoke. Defaults to (10, 30).
+    - sprite_size (Tuple[int, int], optional): The range of sprite sizes of a random smoke. Defaults to (20, 40).
+    - colors (List[Tuple[int, int, int]], optional): The colors a random smoke picks from. Defaults to [(24, 46, 48)].
+    - use_perlin_rate (float, optional): The chance of a random smoke using a Perlin noise mask. Defaults to 0.5.
+    - particle_property (Optional[ParticleProperty], optional): The particle property of random smokes. Defaults to None.
+    - smokes (List[SmokeProperty], optional): Smokes added to every scene besides the random ones. Defaults to [].
+    """
+
+    steps: Tuple[int, int] = (30, 90)
+    time_step: float = 30
+    smoke_count: Tuple[int, int] = (1, 5)
+    particle_count: Tuple[int, int] = (10, 30)
+    sprite_size: Tuple[int, int] = (20, 40)
+    colors: List[Tuple[int, int, int]] = [(24, 46, 48)]
+    use_perlin_rate: float = 0.5
+    particle_property: Optional[ParticleProperty] = None
+    smokes: List[SmokeProperty] = []
@@ -1,9 +1,22 @@
 from smokesim.defs.particle import ParticleProperty
 from smokesim.base import BaseProperty
 
+from enum import Enum
 from typing import Optional, Tuple
 
 
+class OverflowPolicy(str, Enum):
+    """
+    What a smoke does when emitting would exceed its `max_particles`.
+
+    - DROP_OLDEST: remove the oldest particles to make room for the new ones.
+    - SKIP: emit only as many particles as fit, possibly none.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    SKIP = "skip"
+
+
 class SmokeProperty(BaseProperty):
     """
     A dataclass to represent the arguments for a smoke.
@@ -16,6 +29,9 @@ class SmokeProperty(BaseProperty):
     - lifetime (int, optional): The lifetime of the smoke. Defaults to -1.
     - age (int, optional): The age of the smoke. Defaults to 0.
     - id (int, optional): The id of the smoke. Defaults to 0.
+    - use_perlin_rate (float, optional): The chance of using a Perlin noise mask. Defaults to 0.5.
+    - max_particles (Optional[int], optional): The maximum number of live particles. Defaults to None (no cap).
+    - overflow_policy (OverflowPolicy, optional): What to do when the cap is reached. Defaults to OverflowPolicy.DROP_OLDEST.
     """
 
     origin: Tuple[int, int] = (100, 100)
@@ -27,3 +43,5 @@ class SmokeProperty(BaseProperty):
     age: int = 0
     id: int = 0
     use_perlin_rate: float = 0.5
+    max_particles: Optional[int] = None
+    overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST
@@ -1,14 +1,134 @@
+from smokesim.sprite_cache import SpriteCache
+
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Optional, Tuple
+from typing import Optional, Sequence, Tuple
 from pathlib import Path
 import numpy as np
-from PIL import Image
-import cv2
 
 
 class EngineTypes(str, Enum):
     PYGAME = "pygame"
     PIL = "pil"
+    NUMPY = "numpy"
+    OPENCV = "opencv"
+
+
+def clip_rect(
+    pos: Tuple[int, int], size: Tuple[int, int], screen_size: Tuple[int, int]
+) -> Optional[Tuple[slice, slice, slice, slice]]:
+    """
+    A function to clip a rectangle placed at `pos` to the screen.
+
+    Args:
+    - pos (Tuple[int, int]): The (x, y) of the rectangle's top left corner.
+    - size (Tuple[int, int]): The (width, height) of the rectangle.
+    - screen_size (Tuple[int, int]): The (width, height) of the screen.
+
+    Returns:
+    - Optional[Tuple[slice, slice, slice, slice]]: The (rows, cols) slices on the screen followed by
+        the (rows, cols) slices on the rectangle, or None if they do not overlap.
+    """
+    x, y = int(pos[0]), int(pos[1])
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + size[0], screen_size[0]), min(y + size[1], screen_size[1])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (
+        slice(y0, y1),
+        slice(x0, x1),
+        slice(y0 - y, y1 - y),
+        slice(x0 - x, x1 - x),
+    )
+
+
+def blend_array(
+    screen: np.ndarray, image: np.ndarray, pos: Tuple[int, int], alpha: float = 255
+):
+    """
+    A function to draw an image onto a float32 (H, W, 3) screen or (H, W, 4) premultiplied layer in place.
+    A (h, w, 4) image is alpha blended, with its alpha channel in [0, 1] scaled by `alpha` / 255.
+    A (h, w, 3) image is copied.
+
+    Args:
+    - screen (np.ndarray): The screen or layer to draw on.
+    - image (np.ndarray): The image to draw.
+    - pos (Tuple[int, int]): The (x, y) of the image's top left corner.
+    - alpha (float, optional): The opacity of the whole image. Defaults to 255.
+    """
+    rect = clip_rect(
+        pos, (image.shape[1], image.shape[0]), (screen.shape[1], screen.shape[0])
+    )
+    if rect is None:
+        return
+    rows, cols, image_rows, image_cols = rect
+    region = screen[rows, cols]
+    src = image[image_rows, image_cols]
+    if image.shape[-1] == 3:
+        region[...] = src
+        return
+    weight = src[..., 3:] * (alpha / 255)
+    if screen.shape[-1] == 4:
+        # premultiplied "over": the layer's coverage grows towards 1 like its color grows towards the sprite's
+        region[..., :3] += (src[..., :3] - region[..., :3]) * weight
+        region[..., 3:] += (1 - region[..., 3:]) * weight
+    else:
+        region += (src[..., :3] - region) * weight
+
+
+def over_array(screen: np.ndarray, sprite: np.ndarray, pos: Tuple[int, int]):
+    """
+    A function to draw a premultiplied sprite onto a float32 (H, W, 4) premultiplied screen or
+    layer in place with OpenCV: `screen = sprite + screen * (1 - sprite alpha)`, for the color and
+    the coverage at once. The sprite is clipped to the screen.
+
+    Args:
+    - screen (np.ndarray): The screen or layer to draw on.
+    - sprite (np.ndarray): The (2, h, w, 4) float32 sprite, its premultiplied RGBA followed by its transmittance (1 - alpha) in every channel.
+    - pos (Tuple[int, int]): The (x, y) of the sprite's top left corner.
+    """
+    import cv2
+
+    rect = clip_rect(
+        pos, (sprite.shape[2], sprite.shape[1]), (screen.shape[1], screen.shape[0])
+    )
+    if rect is None:
+        return
+    rows, cols, sprite_rows, sprite_cols = rect
+    region = screen[rows, cols]
+    cv2.multiply(region, sprite[1, sprite_rows, sprite_cols], dst=region)
+    cv2.add(region, sprite[0, sprite_rows, sprite_cols], dst=region)
+
+
+def resize_nearest(image: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """
+    A function to resize an image with nearest neighbour sampling. It picks the same pixels as
+    `cv2.resize(..., interpolation=cv2.INTER_NEAREST)` without importing OpenCV.
+
+    Args:
+    - image (np.ndarray): The (H, W) or (H, W, C) image.
+    - size (Tuple[int, int]): The (width, height) to resize to.
+
+    Returns:
+    - np.ndarray: The resized image.
+    """
+    width, height = size
+    src_height, src_width = image.shape[:2]
+    rows = np.floor(np.arange(height) * (1 / (height / src_height))).astype(np.intp)
+    cols = np.floor(np.arange(width) * (1 / (width / src_width))).astype(np.intp)
+    return image[
+        np.minimum(rows, src_height - 1)[:, None], np.minimum(cols, src_width - 1)
+    ]
+
+
+def _round_to_uint8(array: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Helper function to round a float frame to uint8, into `out` if it is given.
+    """
+    if out is None:
+        return np.rint(array).astype(np.uint8)
+    np.copyto(out, np.rint(array), casting="unsafe")
+    return out
 
 
 class BaseEngine:
@@ -25,26 +145,256 @@ class Engine(BaseEngine):
         self,
         screen_dim: Tuple[int, int] = (500, 700),
         engine_type: EngineTypes = EngineTypes.PYGAME,
+        offscreen: bool = False,
+        threads: int = 1,
+        tile_size: int = 256,
     ):
+        """
+        Initialize the Engine class.
+
+        Args:
+        - screen_dim (Tuple[int, int], optional): The (width, height) of the screen. Defaults to (500, 700).
+        - engine_type (EngineTypes, optional): The engine type. Defaults to EngineTypes.PYGAME.
+        - offscreen (bool, optional): Render pygame into a plain Surface without initializing pygame or opening a display. Defaults to False.
+        - threads (int, optional): The NumPy and OpenCV engines draw `blits` tile by tile on this many threads when above 1. Defaults to 1.
+        - tile_size (int, optional): The width and height of the tiles drawn in parallel. Defaults to 256.
+        """
         super().__init__(engine_type)
         self.screen_dim = screen_dim
+        self.offscreen = offscreen
+        self.threads = max(int(threads), 1)
+        self.tile_size = max(int(tile_size), 1)
+        self.executor: Optional[ThreadPoolExecutor] = None
         if engine_type == EngineTypes.PYGAME:
             import pygame
 
             self.engine = pygame
             self.screen: Optional[pygame.Surface] = None
         elif engine_type == EngineTypes.PIL:
+            from PIL import Image
+
             self.engine = Image
             self.screen: Optional[Image.Image] = None
+            # The opaque color and alpha band of every sprite drawn onto a layer
+            self.band_cache = SpriteCache(max_bytes=16 * 2**20)
+        elif engine_type == EngineTypes.NUMPY:
+            self.engine = np
+            self.screen: Optional[np.ndarray] = None
+        elif engine_type == EngineTypes.OPENCV:
+            import cv2
 
-    def blit(self, screen, image, pos):
-        if self.engine_type == EngineTypes.PYGAME:
+            self.engine = cv2
+            self.screen: Optional[np.ndarray] = None
+
+    def blit(
+        self, screen, image, pos, alpha: Optional[int] = None, layer: bool = False
+    ):
+        """
+        A method to draw an image onto the screen.
+
+        Args:
+        - screen: The screen to draw on.
+        - image: The image to draw.
+        - pos: The (x, y) of the image's top left corner.
+        - alpha (Optional[int], optional): The opacity of the whole image in [0, 255]. The PIL engine ignores it. Defaults to None.
+        - layer (bool, optional): Whether `screen` is a layer made by `make_layer`. Defaults to False.
+        """
+        if self.engine_type == EngineTypes.OPENCV:
+            if alpha is not None and alpha != 255:
+                image = self.with_alpha(image, alpha)
+            over_array(screen, image, pos)
+        elif self.engine_type == EngineTypes.PYGAME:
+            # onto a SRCALPHA layer pygame accumulates the coverage in the alpha channel
+            if alpha is not None:
+                image.set_alpha(alpha)
             screen.blit(image, pos)  # Pygame handles alpha blending automatically
         elif self.engine_type == EngineTypes.PIL:
-            # Blend the image with the screen using alpha
-            screen.paste(
-                image, pos, mask=image.split()[-1]
-            )  # Use the alpha channel as the mask
+            if layer:
+                # Pasting the opaque color through the alpha band is the premultiplied "over",
+                # in place: color = src * a + dst * (1 - a), coverage = a + dst * (1 - a)
+                color, alpha_band = self.sprite_bands(image)
+                screen.paste(color, pos, mask=alpha_band)
+                return
+            # Blend the image with the screen, an RGBA mask uses its alpha band without a copy
+            screen.paste(image, pos, mask=image)
+        elif self.engine_type == EngineTypes.NUMPY:
+            blend_array(screen, image, pos, 255 if alpha is None else alpha)
+
+    def blits(self, screen, items: Sequence[tuple], layer: bool = False):
+        """
+        A method to draw many images onto the screen, in order. Pygame draws them with a single
+        `Surface.blits` call, images with an alpha are drawn through `with_alpha` copies so the
+        images themselves are never modified.
+
+        Args:
+        - screen: The screen to draw on.
+        - items (Sequence[tuple]): The (image, pos, alpha) of every image, as in `blit`.
+        - layer (bool, optional): Whether `screen` is a layer made by `make_layer`. Defaults to False.
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            screen.blits(
+                [
+                    (image if alpha is None else self.with_alpha(image, alpha), pos)
+                    for image, pos, alpha in items
+                ],
+                doreturn=False,
+            )
+        elif (
+            self.engine_type in (EngineTypes.NUMPY, EngineTypes.OPENCV)
+            and self.threads > 1
+        ):
+            self.tiled_blits(screen, items)
+        elif self.engine_type in (
+            EngineTypes.PIL,
+            EngineTypes.NUMPY,
+            EngineTypes.OPENCV,
+        ):
+            for image, pos, alpha in items:
+                self.blit(screen, image, pos, alpha=alpha, layer=layer)
+
+    def tiled_blits(self, screen: np.ndarray, items: Sequence[tuple]):
+        """
+        A method to draw many images onto a NumPy or OpenCV screen or layer split into tiles of
+        `tile_size`, drawn concurrently on `threads` threads. Every image is binned into the tiles
+        its rectangle overlaps, and every tile draws its images in order, clipped to the tile.
+        Blending is per pixel, so the result is bit-identical to drawing the images one by one.
+        The NumPy and OpenCV blending ops release the GIL.
+
+        Args:
+        - screen (np.ndarray): The screen or layer to draw on.
+        - items (Sequence[tuple]): The (image, pos, alpha) of every image, as in `blit`.
+        """
+        height, width = screen.shape[:2]
+        tile = self.tile_size
+        columns = -(-width // tile)
+        bins = {}
+        for image, pos, alpha in items:
+            image_width, image_height = self.image_size(image)
+            x, y = int(pos[0]), int(pos[1])
+            x0, y0 = max(x, 0), max(y, 0)
+            x1, y1 = min(x + image_width, width), min(y + image_height, height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            if self.engine_type == EngineTypes.OPENCV and alpha not in (None, 255):
+                # Apply the alpha once, not in every tile
+                image, alpha = self.with_alpha(image, alpha), None
+            for row in range(y0 // tile, (y1 - 1) // tile + 1):
+                for column in range(x0 // tile, (x1 - 1) // tile + 1):
+                    bins.setdefault(row * columns + column, []).append(
+                        (image, x, y, alpha)
+                    )
+
+        def draw_tile(index: int):
+            row, column = divmod(index, columns)
+            top, left = row * tile, column * tile
+            region = screen[top : top + tile, left : left + tile]
+            for image, x, y, alpha in bins[index]:
+                self.blit(region, image, (x - left, y - top), alpha=alpha)
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        # Consume the results so that errors of the tiles are raised here
+        for _ in self.executor.map(draw_tile, bins):
+            pass
+
+    def sprite_bands(self, image) -> tuple:
+        """
+        A method to get a PIL sprite as an opaque color image and its alpha band, from the band
+        cache, splitting it on a miss.
+
+        Args:
+        - image: The RGBA PIL image.
+
+        Returns:
+        - The opaque RGBA image and the "L" alpha band.
+        """
+        bands = self.band_cache.get(id(image))
+        if bands is None:
+            alpha_band = image.getchannel("A")
+            color = image.copy()
+            color.putalpha(255)
+            bands = (color, alpha_band)
+            # The entry keeps the image alive, so its id is not reused while cached
+            self.band_cache.put(
+                id(image), bands, self.image_nbytes(image) * 5 // 4, owner=image
+            )
+        return bands
+
+    def with_alpha(self, image, alpha: int):
+        """
+        A method to make a copy of an image whose opacity is scaled by `alpha`, drawing it is the
+        same as drawing the image with `blit(..., alpha=alpha)`. Only pygame and OpenCV apply
+        the alpha to a copy, the other engines return the image itself.
+
+        Args:
+        - image: The image.
+        - alpha (int): The opacity of the whole image in [0, 255].
+
+        Returns:
+        - The image with the alpha applied.
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            alpha = min(max(int(alpha), 0), 255)
+            copy = image.copy()
+            if not copy.get_flags() & self.engine.SRCALPHA:
+                copy.set_alpha(alpha)
+                return copy
+            # Scaling the per-pixel alpha blends like the surface alpha (pygame floors
+            # `a * alpha / 255`) and keeps the faster per-pixel blitter
+            pixels_alpha = self.engine.surfarray.pixels_alpha(copy)
+            np.floor_divide(
+                pixels_alpha.astype(np.uint16) * alpha,
+                255,
+                out=pixels_alpha,
+                casting="unsafe",
+            )
+            del pixels_alpha
+            return copy
+        elif self.engine_type == EngineTypes.OPENCV:
+            # premultiplied * k and 1 - (1 - transmittance) * k
+            k = np.float32(min(max(int(alpha), 0), 255) / 255)
+            copy = np.multiply(image, k)
+            copy[1] += 1 - k
+            return copy
+        elif self.engine_type in (EngineTypes.PIL, EngineTypes.NUMPY):
+            return image
+
+    def image_size(self, image) -> Tuple[int, int]:
+        """
+        A method to get the (width, height) of an image of the engine.
+
+        Args:
+        - image: The image (Pygame Surface, PIL Image or NumPy array).
+
+        Returns:
+        - Tuple[int, int]: The width and height.
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            return image.get_size()
+        elif self.engine_type == EngineTypes.PIL:
+            return image.size
+        elif self.engine_type == EngineTypes.NUMPY:
+            return image.shape[1], image.shape[0]
+        elif self.engine_type == EngineTypes.OPENCV:
+            # (2, h, w, 4) sprites or (h, w, 3) images
+            return image.shape[-2], image.shape[-3]
+
+    def image_nbytes(self, image) -> int:
+        """
+        A method to get the memory taken by the pixels of an image of the engine.
+
+        Args:
+        - image: The image (Pygame Surface, PIL Image or NumPy array).
+
+        Returns:
+        - int: The number of bytes.
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            return image.get_width() * image.get_height() * image.get_bytesize()
+        elif self.engine_type == EngineTypes.PIL:
+            return image.width * image.height * len(image.getbands())
+        elif self.engine_type in (EngineTypes.NUMPY, EngineTypes.OPENCV):
+            return image.nbytes
 
     def display_image(self, image):
         """
@@ -71,11 +421,26 @@ class Engine(BaseEngine):
             if self.screen_dim != image.size:
                 image = image.resize(self.screen_dim)
             self.screen.paste(image, (0, 0))
+        elif self.engine_type == EngineTypes.NUMPY:
+            if self.screen_dim != (image.shape[1], image.shape[0]):
+                import cv2
+
+                image = cv2.resize(image, self.screen_dim)
+            self.blit(self.screen, image, (0, 0))
+        elif self.engine_type == EngineTypes.OPENCV:
+            if self.screen_dim != (image.shape[1], image.shape[0]):
+                image = self.engine.resize(image, self.screen_dim)
+            # An opaque background: its premultiplied color is itself, its coverage is 1
+            self.screen[..., :3] = image
+            self.screen[..., 3] = 1
         return self
 
     def make_screen(self, screen_dim: Tuple[int, int] = (500, 700)):
         self.screen_dim = screen_dim
         if self.engine_type == EngineTypes.PYGAME:
+            if self.offscreen:
+                # Surfaces, blits and surfarray need no initialized subsystem
+                return self.engine.Surface(self.screen_dim)
             self.engine.init()
             screen = self.engine.display.set_mode(
                 self.screen_dim, flags=self.engine.HIDDEN
@@ -83,14 +448,228 @@ class Engine(BaseEngine):
             return screen
         elif self.engine_type == EngineTypes.PIL:
             return self.engine.new("RGBA", screen_dim, (0, 0, 0, 0))
+        elif self.engine_type == EngineTypes.NUMPY:
+            return np.zeros((screen_dim[1], screen_dim[0], 3), dtype=np.float32)
+        elif self.engine_type == EngineTypes.OPENCV:
+            return np.zeros((screen_dim[1], screen_dim[0], 4), dtype=np.float32)
+
+    def make_layer(self):
+        """
+        A method to make a transparent layer of the screen's size to render smoke into.
+        The NumPy, OpenCV and PIL layers hold premultiplied RGBA, the pygame layer holds straight RGBA.
+
+        Returns:
+        - The layer (Pygame Surface, PIL Image or NumPy array).
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            layer = self.engine.Surface(self.screen_dim, self.engine.SRCALPHA)
+            layer.fill((0, 0, 0, 0))
+            return layer
+        elif self.engine_type == EngineTypes.PIL:
+            return self.engine.new("RGBA", self.screen_dim, (0, 0, 0, 0))
+        elif self.engine_type in (EngineTypes.NUMPY, EngineTypes.OPENCV):
+            return np.zeros(
+                (self.screen_dim[1], self.screen_dim[0], 4), dtype=np.float32
+            )
+
+    def clear_layer(self, layer):
+        """
+        A method to make a layer fully transparent again, in place.
+
+        Args:
+        - layer: The layer made by `make_layer`.
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            layer.fill((0, 0, 0, 0))
+        elif self.engine_type == EngineTypes.PIL:
+            layer.paste((0, 0, 0, 0), (0, 0) + layer.size)
+        elif self.engine_type in (EngineTypes.NUMPY, EngineTypes.OPENCV):
+            layer.fill(0)
+
+    def read_screen(self, screen, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        A method to read a screen back as an (H, W, 3) uint8 RGB array.
+
+        Args:
+        - screen: The screen to read.
+        - out (Optional[np.ndarray], optional): An (H, W, 3) uint8 array to write into. Defaults to None.
+
+        Returns:
+        - np.ndarray: The frame, `out` if it was given.
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            # (W, H, 3) view of the surface's pixels, transposed to (H, W, 3) without copying
+            pixels = self.engine.surfarray.pixels3d(screen)
+            frame = pixels.transpose(1, 0, 2)
+            if out is None:
+                out = frame.copy()
+            else:
+                np.copyto(out, frame)
+            # the surface stays locked while a view of its pixels is alive
+            del pixels, frame
+            return out
+        elif self.engine_type == EngineTypes.PIL:
+            frame = np.asarray(screen.convert("RGB"))
+        elif self.engine_type == EngineTypes.NUMPY:
+            frame = np.rint(screen)
+        elif self.engine_type == EngineTypes.OPENCV:
+            frame = np.rint(screen[..., :3])
+        if out is None:
+            return frame.astype(np.uint8)
+        np.copyto(out, frame, casting="unsafe")
+        return out
+
+    def read_layer(self, layer) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A method to read a layer back as premultiplied float32 arrays.
+
+        Args:
+        - layer: The layer made by `make_layer`.
+
+        Returns:
+        - np.ndarray: The (H, W, 3) smoke color, premultiplied by its coverage, in [0, 255].
+        - np.ndarray: The (H, W, 1) smoke coverage in [0, 1].
+        """
+        if self.engine_type == EngineTypes.PYGAME:
+            pixels = self.engine.surfarray.pixels3d(layer)
+            alpha = self.engine.surfarray.pixels_alpha(layer)
+            coverage = alpha.T[..., None] / np.float32(255)
+            smoke = pixels.transpose(1, 0, 2) * coverage
+            del pixels, alpha
+        elif self.engine_type == EngineTypes.PIL:
+            rgba = np.asarray(layer, dtype=np.float32)
+            coverage = rgba[..., 3:] / 255
+            smoke = rgba[..., :3]
+        elif self.engine_type in (EngineTypes.NUMPY, EngineTypes.OPENCV):
+            coverage = layer[..., 3:]
+            smoke = layer[..., :3]
+        return smoke, coverage
+
+    def compose(
+        self,
+        screen,
+        layer,
+        background,
+        out: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A method to derive the augmented image and the smoke mask from one rendered smoke layer.
+        The image is the layer over `background`, the mask is the layer over black.
+
+        Args:
+        - screen: The screen, used as scratch space.
+        - layer: The layer the smoke was drawn into.
+        - background: The background image.
+        - out (Optional[Tuple[np.ndarray, np.ndarray]], optional): (H, W, 3) uint8 arrays to write the image and mask into. Defaults to None.
+
+        Returns:
+        - np.ndarray: The augmented (H, W, 3) uint8 image.
+        - np.ndarray: The (H, W, 3) uint8 smoke mask.
+        """
+        image_out, mask_out = (None, None) if out is None else out
+        if self.engine_type == EngineTypes.PYGAME:
+            screen.blit(background, (0, 0))
+            screen.blit(layer, (0, 0))
+            if not self.offscreen:
+                self.engine.display.flip()
+            image = self.read_screen(screen, image_out)
+            screen.fill((0, 0, 0))
+            screen.blit(layer, (0, 0))
+            mask = self.read_screen(screen, mask_out)
+            return image, mask
+        if self.engine_type == EngineTypes.OPENCV:
+            cv2 = self.engine
+            # Whole-frame OpenCV ops on contiguous planes, rounded half to even like np.rint
+            transmittance = 1 - cv2.extractChannel(layer, 3)
+            smoke = cv2.cvtColor(layer, cv2.COLOR_RGBA2RGB)
+            composed = cv2.multiply(
+                background,
+                cv2.merge((transmittance, transmittance, transmittance)),
+                dtype=cv2.CV_32F,
+            )
+            cv2.add(composed, smoke, dst=composed)
+            image = cv2.convertScaleAbs(composed, dst=image_out)
+            mask = cv2.convertScaleAbs(smoke, dst=mask_out)
+            return image, mask
+        smoke, coverage = self.read_layer(layer)
+        if self.engine_type == EngineTypes.PIL:
+            base = np.asarray(background.convert("RGB"), dtype=np.float32)
+            composed = smoke + base * (1 - coverage)
+        elif self.engine_type == EngineTypes.NUMPY:
+            composed = np.multiply(background, 1 - coverage, out=screen)
+            composed += smoke
+        image = _round_to_uint8(composed, image_out)
+        mask = _round_to_uint8(smoke, mask_out)
+        return image, mask
+
+    def compose_batch(
+        self,
+        screen,
+        layer,
+        backgrounds: np.ndarray,
+        out: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+        chunk_size: int = 16,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A method to derive the augmented images and the smoke masks of a batch of backgrounds
+        from one rendered smoke layer, rounded like `compose`.
+
+        Args:
+        - screen: The screen, used as scratch space.
+        - layer: The layer the smoke was drawn into.
+        - backgrounds (np.ndarray): The (N, H, W, 3) uint8 RGB backgrounds, the size of the screen.
+        - out (Optional[Tuple[np.ndarray, np.ndarray]], optional): (N, H, W, 3) uint8 arrays to write the images and masks into. Defaults to None.
+        - chunk_size (int, optional): How many images are composited at once. Defaults to 16.
+
+        Returns:
+        - np.ndarray: The augmented (N, H, W, 3) uint8 images.
+        - np.ndarray: The (N, H, W, 3) uint8 smoke masks.
+        """
+        if out is None:
+            out = (np.empty_like(backgrounds), np.empty_like(backgrounds))
+        images_out, masks_out = out
+        if self.engine_type == EngineTypes.PYGAME:
+            # Blend with SDL like `compose`, its integer blending rounds differently from NumPy
+            screen.fill((0, 0, 0))
+            screen.blit(layer, (0, 0))
+            masks_out[...] = self.read_screen(screen)
+            for background, image_out in zip(backgrounds, images_out):
+                surface = self.engine.surfarray.make_surface(
+                    background.transpose(1, 0, 2)
+                )
+                screen.blit(surface, (0, 0))
+                screen.blit(layer, (0, 0))
+                self.read_screen(screen, image_out)
+            return images_out, masks_out
+        smoke, coverage = self.read_layer(layer)
+        transmittance = 1 - coverage
+        masks_out[...] = _round_to_uint8(smoke)
+        chunk_size = max(chunk_size, 1)
+        for start in range(0, len(backgrounds), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            composed = backgrounds[chunk] * transmittance
+            composed += smoke
+            _round_to_uint8(composed, images_out[chunk])
+        return images_out, masks_out
 
     def make_surface(self, image: np.ndarray):
         if self.engine_type == EngineTypes.PYGAME:
-            self.image = self.engine.surfarray.make_surface(image)
-            self.image = self.engine.transform.scale(self.image, self.screen_dim)
+            import cv2
+
+            # surfarray is indexed (x, y), so hand it the (W, H, 3) view of the resized image
+            image = cv2.resize(image[..., :3], self.screen_dim)
+            self.image = self.engine.surfarray.make_surface(image.transpose(1, 0, 2))
         elif self.engine_type == EngineTypes.PIL:
             self.image = self.engine.fromarray(image)
             self.image = self.image.resize(self.screen_dim)
+        elif self.engine_type == EngineTypes.NUMPY:
+            import cv2
+
+            self.image = cv2.resize(image[..., :3], self.screen_dim)
+        elif self.engine_type == EngineTypes.OPENCV:
+            self.image = self.engine.resize(
+                np.ascontiguousarray(image[..., :3]), self.screen_dim
+            )
         return self.image
 
     def read_image(self, image_path: Optional[Path] = None):
@@ -105,16 +684,19 @@ class Engine(BaseEngine):
                     )
                     try:
                         # Use Pillow as a fallback
+                        from PIL import Image
+
                         pil_image = Image.open(image_path).convert("RGB")
                         image_array = np.array(pil_image)
-                        self.image = self.engine.surfarray.make_surface(image_array)
-                        self.image = self.engine.transform.rotate(self.image, -90)
+                        self.image = self.engine.surfarray.make_surface(
+                            image_array.transpose(1, 0, 2)
+                        )
                     except Exception as pil_e:
                         raise RuntimeError(f"Failed to load image with Pillow: {pil_e}")
             else:
-                # Create a blank image with valid dimensions
+                # Create a blank image with valid dimensions, surfarray is indexed (x, y)
                 blank_array = np.zeros(
-                    (self.screen_dim[1], self.screen_dim[0], 3), dtype=np.uint8
+                    (self.screen_dim[0], self.screen_dim[1], 3), dtype=np.uint8
                 )
                 self.image = self.engine.surfarray.make_surface(blank_array)
 
@@ -123,7 +705,7 @@ class Engine(BaseEngine):
             self.image = self.engine.transform.scale(self.image, self.screen_dim)
 
             blank_image = self.engine.surfarray.make_surface(
-                np.zeros((self.screen_dim[1], self.screen_dim[0], 3), dtype=np.uint8)
+                np.zeros((self.screen_dim[0], self.screen_dim[1], 3), dtype=np.uint8)
             )
             if hasattr(blank_image, "set_alpha"):
                 blank_image.set_alpha(255)
@@ -143,6 +725,42 @@ class Engine(BaseEngine):
             self.image = self.image.resize(self.screen_dim)
             self.blank_image = self.engine.new("RGBA", self.screen_dim, (0, 0, 0, 0))
 
+        elif self.engine_type == EngineTypes.NUMPY:
+            blank_array = np.zeros(
+                (self.screen_dim[1], self.screen_dim[0], 3), dtype=np.uint8
+            )
+            import cv2
+
+            image = None
+            if image_path is not None and image_path.exists():
+                image = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise RuntimeError(f"Failed to open image: {image_path}")
+                image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            self.image = cv2.resize(
+                blank_array if image is None else image, self.screen_dim
+            )
+            self.blank_image = blank_array
+
+        elif self.engine_type == EngineTypes.OPENCV:
+            blank_array = np.zeros(
+                (self.screen_dim[1], self.screen_dim[0], 3), dtype=np.uint8
+            )
+            image = None
+            if image_path is not None and Path(image_path).exists():
+                # imdecode reads paths imread cannot, e.g. non-ASCII ones on Windows
+                image = self.engine.imdecode(
+                    np.fromfile(str(image_path), dtype=np.uint8),
+                    self.engine.IMREAD_COLOR,
+                )
+                if image is None:
+                    raise RuntimeError(f"Failed to open image: {image_path}")
+                image = self.engine.cvtColor(image, self.engine.COLOR_BGR2RGB)
+            self.image = self.engine.resize(
+                blank_array if image is None else image, self.screen_dim
+            )
+            self.blank_image = blank_array
+
     def paint_sprite(self, sprite):
         """
         A method to paint a sprite.
@@ -151,44 +769,111 @@ class Engine(BaseEngine):
         - sprite: The sprite to paint.
 
         Returns:
-        - The painted sprite (Pygame Surface or PIL Image).
+        - The painted sprite (Pygame Surface, PIL Image or NumPy array).
         """
         # Resize the opacity mask to match the sprite dimensions
-        resized_opacity_mask = cv2.resize(
-            sprite.opacity_mask,
-            (sprite.width, sprite.height),
-            interpolation=cv2.INTER_NEAREST,
+        resized_opacity_mask = resize_nearest(
+            sprite.opacity_mask, (sprite.width, sprite.height)
         )
 
+        color = tuple(int(c) for c in sprite.color)
+
         if self.engine_type == EngineTypes.PYGAME:
             surface = self.engine.Surface(
                 (sprite.width, sprite.height), self.engine.SRCALPHA
             )
-            for x in range(sprite.width):
-                for y in range(sprite.height):
-                    alpha = int(resized_opacity_mask[y, x])
-                    color = (*sprite.color, alpha)
-                    surface.set_at((x, y), color)
+            # surfarray views are indexed (x, y), the mask is (y, x)
+            pixels = self.engine.surfarray.pixels3d(surface)
+            pixels[...] = color
+            del pixels
+            alpha = self.engine.surfarray.pixels_alpha(surface)
+            alpha[...] = resized_opacity_mask.T
+            del alpha
+            # Match the display's pixel format so blits need no conversion. Offscreen
+            # rendering has no display to convert to, the SRCALPHA format is kept.
+            display = self.engine.display
+            if display.get_init() and display.get_surface() is not None:
+                surface = surface.convert_alpha()
             return surface
 
         elif self.engine_type == EngineTypes.PIL:
-            from PIL import Image, ImageDraw
-
-            surface = Image.new("RGBA", (sprite.width, sprite.height), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(surface)
-            for x in range(sprite.width):
-                for y in range(sprite.height):
-                    alpha = int(
-                        resized_opacity_mask[y, x]
-                    )  # Ensure alpha is an integer
-                    color = tuple(map(int, sprite.color)) + (
-                        alpha,
-                    )  # Ensure all components are integers
-                    draw.point((x, y), fill=color)
+            rgba = np.empty((sprite.height, sprite.width, 4), dtype=np.uint8)
+            rgba[..., :3] = color
+            rgba[..., 3] = resized_opacity_mask
+            return self.engine.frombuffer(
+                "RGBA", (sprite.width, sprite.height), rgba, "raw", "RGBA", 0, 1
+            )
+
+        elif self.engine_type == EngineTypes.NUMPY:
+            # float32 color in [0, 255] and alpha in [0, 1], ready for `blend_array`
+            rgba = np.empty((sprite.height, sprite.width, 4), dtype=np.float32)
+            rgba[..., :3] = color
+            rgba[..., 3] = resized_opacity_mask / 255
+            return rgba
+
+        elif self.engine_type == EngineTypes.OPENCV:
+            # premultiplied RGBA and transmittance, ready for `over_array`
+            alpha = (resized_opacity_mask / np.float32(255))[..., None]
+            sprite_paint = np.empty((2, sprite.height, sprite.width, 4), np.float32)
+            sprite_paint[0, ..., :3] = np.multiply(color, alpha, dtype=np.float32)
+            sprite_paint[0, ..., 3:] = alpha
+            sprite_paint[1] = 1 - alpha
+            return sprite_paint
+
+    def paint_image(self, rgba: np.ndarray):
+        """
+        A method to paint an RGBA image as a sprite, e.g. a whole frame of smoke drawn at (0, 0).
+
+        Args:
+        - rgba (np.ndarray): The (H, W, 4) uint8 RGBA image, not premultiplied.
+
+        Returns:
+        - The painted sprite (Pygame Surface, PIL Image or NumPy array).
+        """
+        rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+        height, width = rgba.shape[:2]
+
+        if self.engine_type == EngineTypes.PYGAME:
+            surface = self.engine.Surface((width, height), self.engine.SRCALPHA)
+            pixels = self.engine.surfarray.pixels3d(surface)
+            pixels[...] = rgba[..., :3].transpose(1, 0, 2)
+            del pixels
+            alpha = self.engine.surfarray.pixels_alpha(surface)
+            alpha[...] = rgba[..., 3].T
+            del alpha
+            display = self.engine.display
+            if display.get_init() and display.get_surface() is not None:
+                surface = surface.convert_alpha()
             return surface
 
+        elif self.engine_type == EngineTypes.PIL:
+            return self.engine.frombuffer(
+                "RGBA", (width, height), rgba, "raw", "RGBA", 0, 1
+            )
+
+        elif self.engine_type == EngineTypes.NUMPY:
+            image = rgba.astype(np.float32)
+            image[..., 3] /= 255
+            return image
+
+        elif self.engine_type == EngineTypes.OPENCV:
+            alpha = (rgba[..., 3] / np.float32(255))[..., None]
+            sprite_paint = np.empty((2, height, width, 4), np.float32)
+            np.multiply(rgba[..., :3], alpha, out=sprite_paint[0, ..., :3])
+            sprite_paint[0, ..., 3:] = alpha
+            sprite_paint[1] = 1 - alpha
+            return sprite_paint
+
     def end(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
         if self.engine_type == EngineTypes.PYGAME:
-            self.engine.quit()
-        elif self.engine_type == EngineTypes.PIL:
+            if not self.offscreen:
+                self.engine.quit()
+        elif self.engine_type in (
+            EngineTypes.PIL,
+            EngineTypes.NUMPY,
+            EngineTypes.OPENCV,
+        ):
             pass
@@ -0,0 +1,329 @@
+"""
+Module to generate a synthetic smoke dataset in parallel.
+
+Example:
+    python -m smokesim.generate --backgrounds assets --count 1000 --out-dir dataset --workers 8
+"""
+
+from smokesim.augmentation import Augmentation
+from smokesim.smoke import SmokeMachine
+from smokesim.engine import EngineTypes
+from smokesim.mask_bank import MaskBank
+from smokesim.defs import SceneProperty, SmokeProperty, ParticleProperty
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+import argparse
+import os
+import numpy as np
+import cv2
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+# The state of a worker process, made once by `_init_worker`. It holds one augmentation, so
+# each worker keeps one engine across samples.
+_worker: dict = {}
+
+
+def list_backgrounds(background_dir: Path) -> List[Path]:
+    """
+    A function to list the background images of a directory, sorted so that indices are stable.
+
+    Args:
+    - background_dir (Path): The directory of background images.
+
+    Returns:
+    - List[Path]: The image paths.
+    """
+    paths = sorted(
+        p for p in Path(background_dir).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES
+    )
+    if not paths:
+        raise ValueError(f"No background images found in {background_dir}")
+    return paths
+
+
+def sample_seed(master_seed: int, index: int) -> int:
+    """
+    A function to derive the seed of one sample from the master seed. It only depends on the
+    sample index, so results are the same for any number of workers.
+
+    Args:
+    - master_seed (int): The master seed.
+    - index (int): The sample index.
+
+    Returns:
+    - int: The sample seed.
+    """
+    return int(np.random.SeedSequence([master_seed, index]).generate_state(1)[0])
+
+
+def make_smoke_machine(
+    engine_type: EngineTypes, mask_bank: Optional[MaskBank] = None
+) -> SmokeMachine:
+    """
+    A function to make the smoke machine samples are rendered with.
+
+    Args:
+    - engine_type (EngineTypes): The engine type.
+    - mask_bank (Optional[MaskBank], optional): The bank to pick Perlin masks from. Defaults to None.
+
+    Returns:
+    - SmokeMachine: The smoke machine.
+    """
+    return SmokeMachine(engine_type=engine_type, mask_bank=mask_bank)
+
+
+def render_sample(
+    augmentation: Augmentation,
+    background: np.ndarray,
+    scene: SceneProperty,
+    seed: int,
+    mask_bank: Optional[MaskBank] = None,
+    smoke_machine: Optional[SmokeMachine] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    A function to render one sample of a scene. A given smoke machine is reset and reseeded, so
+    its sprite cache and the Perlin masks in it are reused across samples. The result is the
+    same as with a fresh smoke machine.
+
+    Args:
+    - augmentation (Augmentation): The augmentation whose engine is used.
+    - background (np.ndarray): The (H, W, 3) RGB background image.
+    - scene (SceneProperty): The scene parameters.
+    - seed (int): The sample seed.
+    - mask_bank (Optional[MaskBank], optional): The bank to pick Perlin masks from. Defaults to None.
+    - smoke_machine (Optional[SmokeMachine], optional): The smoke machine to reuse, made with `make_smoke_machine`. Defaults to None (a fresh one).
+
+    Returns:
+    - np.ndarray: The smoke overlayed image.
+    - np.ndarray: The smoke only image.
+    """
+    random_state = np.random.default_rng(seed)
+    width, height = augmentation.screen_dim
+    if smoke_machine is None:
+        smoke_machine = make_smoke_machine(augmentation.engine_type, mask_bank)
+    smoke_machine.reset(seed)
+    augmentation.smoke_machine = smoke_machine
+
+    smoke_properties = [s.model_copy(deep=True) for s in scene.smokes]
+    for _ in range(random_state.integers(*scene.smoke_count, endpoint=True)):
+        color = scene.colors[random_state.integers(len(scene.colors))]
+        smoke_properties.append(
+            SmokeProperty(
+                origin=(
+                    int(random_state.integers(width)),
+                    int(random_state.integers(height)),
+                ),
+                particle_count=int(
+                    random_state.integers(*scene.particle_count, endpoint=True)
+                ),
+                sprite_size=int(
+                    random_state.integers(*scene.sprite_size, endpoint=True)
+                ),
+                color=tuple(color),
+                use_perlin_rate=scene.use_perlin_rate,
+                particle_property=(
+                    scene.particle_property or ParticleProperty(color=tuple(color))
+                ).model_copy(deep=True),
+            )
+        )
+    for smoke_property in smoke_properties:
+        smoke_property.random_seed = int(random_state.integers(2**31 - 1))
+        smoke_machine.add_smoke(smoke_property)
+
+    steps = int(random_state.integers(*scene.steps, endpoint=True))
+    return augmentation.augment(
+        steps=steps, time_step=scene.time_step, image=background
+    )
+
+
+def read_background(path: Path) -> np.ndarray:
+    """
+    A function to read a background image as RGB.
+    """
+    image = cv2.imread(str(path))
+    if image is None:
+        raise ValueError(f"Could not read background image {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def _init_worker(
+    screen_dim: Tuple[int, int],
+    engine_type: EngineTypes,
+    scene: SceneProperty,
+    mask_bank: Optional[MaskBank],
+    backgrounds: List[Path],
+    out_dir: Path,
+    master_seed: int,
+):
+    """
+    Make the state of a worker process once.
+    """
+    mask_bank = mask_bank.build() if mask_bank is not None else None
+    _worker.update(
+        augmentation=Augmentation(
+            image_path=None, screen_dim=screen_dim, engine_type=engine_type
+        ),
+        smoke_machine=make_smoke_machine(engine_type, mask_bank),
+        scene=scene,
+        mask_bank=mask_bank,
+        backgrounds=backgrounds,
+        out_dir=out_dir,
+        master_seed=master_seed,
+    )
+
+
+def _generate_one(index: int) -> int:
+    """
+    Render sample `index` in the worker and write its image and mask.
+    """
+    seed = sample_seed(_worker["master_seed"], index)
+    backgrounds = _worker["backgrounds"]
+    background = backgrounds[np.random.default_rng(seed).integers(len(backgrounds))]
+    image, mask = render_sample(
+        _worker["augmentation"],
+        read_background(background),
+        _worker["scene"],
+        seed,
+        mask_bank=_worker["mask_bank"],
+        smoke_machine=_worker["smoke_machine"],
+    )
+    name = f"{index:08d}.png"
+    out_dir = _worker["out_dir"]
+    cv2.imwrite(str(out_dir / "images" / name), cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+    cv2.imwrite(str(out_dir / "masks" / name), cv2.cvtColor(mask, cv2.COLOR_RGB2BGR))
+    return index
+
+
+def generate(
+    background_dir: Path,
+    count: int,
+    out_dir: Path,
+    scene: Optional[SceneProperty] = None,
+    screen_dim: Tuple[int, int] = (700, 500),
+    engine_type: EngineTypes = EngineTypes.PYGAME,
+    master_seed: int = 100,
+    workers: Optional[int] = None,
+    mask_bank: Optional[MaskBank] = None,
+    start: int = 0,
+    verbose: bool = False,
+):
+    """
+    A function to generate `count` image/mask pairs into `out_dir/images` and `out_dir/masks`.
+
+    Args:
+    - background_dir (Path): The directory of background images.
+    - count (int): The number of samples.
+    - out_dir (Path): The output directory.
+    - scene (Optional[SceneProperty], optional): The scene parameters. Defaults to None (SceneProperty()).
+    - screen_dim (Tuple[int, int], optional): The (width, height) of the samples. Defaults to (700, 500).
+    - engine_type (EngineTypes, optional): The engine type. Defaults to EngineTypes.PYGAME.
+    - master_seed (int, optional): The seed every sample seed is derived from. Defaults to 100.
+    - workers (Optional[int], optional): The size of the process pool, 1 to generate in-process. Defaults to None (CPU count).
+    - mask_bank (Optional[MaskBank], optional): The bank to pick Perlin masks from. Defaults to None.
+    - start (int, optional): The index of the first sample, to resume or shard a run. Defaults to 0.
+    - verbose (bool, optional): Whether to print the progress. Defaults to False.
+    """
+    scene = scene if scene is not None else SceneProperty()
+    backgrounds = list_backgrounds(background_dir)
+    out_dir = Path(out_dir)
+    (out_dir / "images").mkdir(parents=True, exist_ok=True)
+    (out_dir / "masks").mkdir(parents=True, exist_ok=True)
+    if mask_bank is not None:
+        # Generate the bank once here instead of racing to generate it in every worker
+        mask_bank.build()
+
+    indices = range(start, start + count)
+    initargs = (
+        screen_dim,
+        engine_type,
+        scene,
+        mask_bank,
+        backgrounds,
+        out_dir,
+        master_seed,
+    )
+    if workers == 1:
+        _init_worker(*initargs)
+        _consume(map(_generate_one, indices), count, verbose)
+        _worker.pop("augmentation").end()
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=initargs
+    ) as executor:
+        results = executor.map(
+            _generate_one,
+            indices,
+            chunksize=max(1, min(64, count // (4 * workers))),
+        )
+        _consume(results, count, verbose)
+
+
+def _consume(results, count: int, verbose: bool):
+    """
+    Wait for every sample, printing the progress if `verbose`.
+    """
+    for done, _ in enumerate(results, start=1):
+        if verbose and (done % 100 == 0 or done == count):
+            print(f"Generated {done}/{count} samples")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic smoke dataset of image/mask pairs."
+    )
+    parser.add_argument("--backgrounds", type=Path, required=True)
+    parser.add_argument("--count", type=int, required=True)
+    parser.add_argument("--out-dir", type=Path, required=True)
+    parser.add_argument(
+        "--scene", type=Path, default=None, help="JSON file of a SceneProperty."
+    )
+    parser.add_argument("--width", type=int, default=700)
+    parser.add_argument("--height", type=int, default=500)
+    parser.add_argument(
+        "--engine",
+        type=EngineTypes,
+        default=EngineTypes.PYGAME,
+        choices=list(EngineTypes),
+    )
+    parser.add_argument("--seed", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument(
+        "--mask-bank",
+        type=int,
+        default=0,
+        help="Pick Perlin masks from a bank of this many masks (0 to generate them per smoke).",
+    )
+    args = parser.parse_args(argv)
+
+    scene = (
+        SceneProperty.model_validate_json(args.scene.read_text())
+        if args.scene
+        else SceneProperty()
+    )
+    mask_bank = (
+        MaskBank(count=args.mask_bank, random_seed=args.seed, max_workers=args.workers)
+        if args.mask_bank > 0
+        else None
+    )
+    generate(
+        args.backgrounds,
+        args.count,
+        args.out_dir,
+        scene=scene,
+        screen_dim=(args.width, args.height),
+        engine_type=args.engine,
+        master_seed=args.seed,
+        workers=args.workers,
+        mask_bank=mask_bank,
+        start=args.start,
+        verbose=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Module to pre-generate Perlin cloud masks once and reuse them across smokes and processes.
+"""
+
+from smokesim.noise import PerlinNoise, FalloffProfile
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Tuple, Union
+import hashlib
+import json
+import os
+import numpy as np
+
+
+def _generate_mask(seed: int, params: dict) -> np.ndarray:
+    """
+    Generate one mask of the bank. Module level so that it can be sent to worker processes.
+    """
+    noise = PerlinNoise(
+        seed=seed,
+        octaves=params["octaves"],
+        persistence=params["persistence"],
+        lacunarity=params["lacunarity"],
+        falloff=params["falloff"],
+        noise_dimension=params["noise_dimension"],
+        falloff_profile=FalloffProfile(params["falloff_profile"]),
+    )
+    return noise.generate_cloud_mask(
+        width=params["size"], height=params["size"], scale=params["scale"]
+    )
+
+
+class MaskBank:
+    def __init__(
+        self,
+        size: int = 20,
+        count: int = 64,
+        scale: Optional[Union[float, Tuple[float, float]]] = None,
+        octaves: Union[int, Tuple[int, int]] = (1, 8),
+        persistence: Union[float, Tuple[float, float]] = (0.2, 5.8),
+        lacunarity: Union[float, Tuple[float, float]] = (0.5, 10.0),
+        falloff: Union[float, Tuple[float, float]] = 1.2,
+        falloff_profile: FalloffProfile = FalloffProfile.RADIAL,
+        noise_dimension: int = 2,
+        random_seed: int = 100,
+        cache_dir: Path = Path(".smokesim_cache/masks"),
+        max_workers: Optional[int] = None,
+        max_in_memory: int = 16,
+    ):
+        """
+        A bank of `count` procedural cloud masks, generated once in a process pool and stored on
+        disk as one memory-mapped `.npy` file plus a JSON index. Smokes pick masks from the bank
+        by seed instead of generating their own.
+
+        Args:
+        - size (int, optional): The width and height of every mask. Defaults to 20.
+        - count (int, optional): The number of masks in the bank. Defaults to 64.
+        - scale (Optional[Union[float, Tuple[float, float]]], optional): The noise scale. Defaults to `size`.
+        - octaves, persistence, lacunarity, falloff (optional): The `PerlinNoise` parameters (or ranges).
+        - falloff_profile (FalloffProfile, optional): The edge falloff. Defaults to FalloffProfile.RADIAL.
+        - noise_dimension (int, optional): 2 or 3. Defaults to 2.
+        - random_seed (int, optional): The seed the per-mask seeds are drawn from. Defaults to 100.
+        - cache_dir (Path, optional): Where the bank is stored. Defaults to Path('.smokesim_cache/masks').
+        - max_workers (Optional[int], optional): The size of the process pool, 1 to generate in-process. Defaults to None (CPU count).
+        - max_in_memory (int, optional): How many masks are kept as in-memory copies. Defaults to 16.
+        """
+        self.params = dict(
+            size=int(size),
+            count=int(count),
+            scale=size if scale is None else scale,
+            octaves=octaves,
+            persistence=persistence,
+            lacunarity=lacunarity,
+            falloff=falloff,
+            falloff_profile=FalloffProfile(falloff_profile).value,
+            noise_dimension=int(noise_dimension),
+            random_seed=int(random_seed),
+        )
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers
+        self.max_in_memory = max_in_memory
+        self.masks: Optional[np.ndarray] = None
+        self.cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+
+    @property
+    def key(self) -> str:
+        """
+        The cache key of the bank. It covers every generation parameter.
+        """
+        params = json.dumps(self.params, sort_keys=True)
+        return hashlib.sha1(params.encode("utf-8")).hexdigest()[:16]
+
+    @property
+    def path(self) -> Path:
+        return self.cache_dir / f"masks_{self.key}.npy"
+
+    @property
+    def index_path(self) -> Path:
+        return self.cache_dir / f"masks_{self.key}.json"
+
+    def __len__(self):
+        return self.params["count"]
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        # A memory map is pickled as a full array. The process the bank is sent to opens the
+        # file again, lazily, on its first `get`.
+        state.update(masks=None, cache=OrderedDict())
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+
+    def mask_seeds(self) -> np.ndarray:
+        """
+        The seed of every mask in the bank.
+        """
+        rng = np.random.default_rng(self.params["random_seed"])
+        return rng.integers(1, 2**31 - 1, size=self.params["count"])
+
+    def build(self) -> "MaskBank":
+        """
+        A method to load the bank from disk, generating and storing it first if needed.
+
+        Returns:
+        - MaskBank: The bank itself.
+        """
+        masks = self.load()
+        if masks is None:
+            self.generate()
+            masks = np.load(self.path, mmap_mode="r")
+        self.masks = masks
+        self.cache.clear()
+        return self
+
+    def load(self) -> Optional[np.ndarray]:
+        """
+        A method to open the bank stored in `cache_dir`. It is only used if its index was written
+        for the same key and the masks have the expected shape, a bank left truncated or written
+        with other parameters has to be generated again.
+
+        Returns:
+        - Optional[np.ndarray]: The memory-mapped (count, size, size) uint8 masks, or None.
+        """
+        size, count = self.params["size"], self.params["count"]
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+            masks = np.load(self.path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        if not isinstance(index, dict) or index.get("key") != self.key:
+            return None
+        if masks.shape != (count, size, size) or masks.dtype != np.uint8:
+            return None
+        return masks
+
+    def generate(self):
+        """
+        A method to generate every mask and write the bank to `cache_dir`.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        seeds = [int(s) for s in self.mask_seeds()]
+        size, count = self.params["size"], self.params["count"]
+
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp.npy")
+        masks = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.uint8, shape=(count, size, size)
+        )
+        if self.max_workers == 1:
+            for i, seed in enumerate(seeds):
+                masks[i] = _generate_mask(seed, self.params)
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                results = executor.map(
+                    _generate_mask,
+                    seeds,
+                    [self.params] * count,
+                    chunksize=max(1, count // (4 * (os.cpu_count() or 1))),
+                )
+                for i, mask in enumerate(results):
+                    masks[i] = mask
+        masks.flush()
+        del masks
+        os.replace(tmp_path, self.path)
+
+        tmp_index = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_index, "w") as f:
+            json.dump(dict(key=self.key, params=self.params, seeds=seeds), f, indent=2)
+        os.replace(tmp_index, self.index_path)
+
+    def get(self, index: int) -> np.ndarray:
+        """
+        A method to get one mask of the bank as an in-memory copy. Recently used copies are kept,
+        the least recently used one is evicted once there are more than `max_in_memory`.
+
+        Args:
+        - index (int): The index of the mask.
+
+        Returns:
+        - np.ndarray: The (size, size) uint8 mask.
+        """
+        if self.masks is None:
+            self.build()
+        index = int(index) % len(self)
+        if index in self.cache:
+            self.cache.move_to_end(index)
+            return self.cache[index]
+        mask = np.array(self.masks[index])
+        self.cache[index] = mask
+        while len(self.cache) > max(self.max_in_memory, 0):
+            self.cache.popitem(last=False)
+        return mask
+
+    def pick(self, seed: int) -> np.ndarray:
+        """
+        A method to pick a mask deterministically from a seed.
+
+        Args:
+        - seed (int): The seed.
+
+        Returns:
+        - np.ndarray: The (size, size) uint8 mask.
+        """
+        state = np.random.SeedSequence(abs(int(seed))).generate_state(1)[0]
+        return self.get(int(state) % len(self))
@@ -1,5 +1,18 @@
 import numpy as np
-from typing import Union, Tuple, Optional
+from enum import Enum
+from typing import Union, Tuple, Optional, Callable
+
+
+class FalloffProfile(str, Enum):
+    """
+    Shape of the edge falloff applied by `PerlinNoise.generate_cloud_mask`.
+
+    - RADIAL: circular falloff, distance normalized by the distance from the center to a corner.
+    - ELLIPTICAL: falloff stretched to the mask's aspect ratio, distance normalized per axis.
+    """
+
+    RADIAL = "radial"
+    ELLIPTICAL = "elliptical"
 
 
 class PerlinNoise:
@@ -7,6 +20,9 @@ class PerlinNoise:
     https://en.wikipedia.org/wiki/Perlin_noise
     """
 
+    # Number of entries in the permutation and gradient tables. Must be a power of two.
+    TABLE_SIZE = 256
+
     def __init__(
         self,
         seed: Optional[int] = None,
@@ -15,8 +31,11 @@ class PerlinNoise:
         lacunarity: Union[float, Tuple[float, float]] = 2.0,
         falloff: Union[float, Tuple[float, float]] = 1.2,
         noise_dimension: int = 2,
+        falloff_profile: Union[
+            FalloffProfile, Callable[[np.ndarray], np.ndarray]
+        ] = FalloffProfile.RADIAL,
     ):
-        self.seed = seed or np.random.randint(0, 100)
+        self.seed = seed if seed is not None else np.random.randint(0, 100)
         self.random_state = np.random.RandomState(self.seed)
 
         # Resolve parameters
@@ -25,8 +44,19 @@ class PerlinNoise:
         self.lacunarity = self._resolve_param(lacunarity)
         self.falloff = self._resolve_param(falloff)
         self.noise_dimension = noise_dimension
+        self.falloff_profile = falloff_profile
 
-        self.gradients = {}
+        # Fixed-size lattice tables. A lattice point is hashed into the permutation table
+        # and the result picks one of the precomputed gradients.
+        self.permutation = self.random_state.permutation(self.TABLE_SIZE)
+        angle = self.random_state.uniform(0, 2 * np.pi, self.TABLE_SIZE)
+        self.gradients = np.stack([np.cos(angle), np.sin(angle)], axis=-1)
+        theta = self.random_state.uniform(0, 2 * np.pi, self.TABLE_SIZE)
+        phi = self.random_state.uniform(0, np.pi, self.TABLE_SIZE)
+        self.gradients_3d = np.stack(
+            [np.sin(phi) * np.cos(theta), np.sin(phi) * np.sin(theta), np.cos(phi)],
+            axis=-1,
+        )
 
     def _resolve_param(self, value: Union[float, int, Tuple[float, float]]) -> float:
         """Helper function to resolve a parameter to a single value."""
@@ -34,26 +64,23 @@ class PerlinNoise:
             return self.random_state.uniform(value[0], value[1])
         return value
 
+    def _hash(self, *indices: np.ndarray) -> np.ndarray:
+        """Helper function to map integer lattice coordinates to an index of the gradient tables."""
+        mask = self.TABLE_SIZE - 1
+        h = np.zeros(np.shape(indices[0]), dtype=np.int64)
+        for index in indices:
+            h = self.permutation[(h + index) & mask]
+        return h
+
     def _dot_grid_gradient(self, ix, iy, x, y):
-        if (ix, iy) not in self.gradients:
-            angle = self.random_state.uniform(0, 2 * np.pi)
-            self.gradients[(ix, iy)] = (np.cos(angle), np.sin(angle))
-        gradient = self.gradients[(ix, iy)]
+        gradient = self.gradients[self._hash(ix, iy)]
         dx, dy = x - ix, y - iy
-        return dx * gradient[0] + dy * gradient[1]
+        return dx * gradient[..., 0] + dy * gradient[..., 1]
 
     def _dot_grid_gradient_3d(self, ix, iy, iz, x, y, z):
-        if (ix, iy, iz) not in self.gradients:
-            theta = self.random_state.uniform(0, 2 * np.pi)
-            phi = self.random_state.uniform(0, np.pi)
-            self.gradients[(ix, iy, iz)] = (
-                np.sin(phi) * np.cos(theta),
-                np.sin(phi) * np.sin(theta),
-                np.cos(phi),
-            )
-        gradient = self.gradients[(ix, iy, iz)]
+        gradient = self.gradients_3d[self._hash(ix, iy, iz)]
         dx, dy, dz = x - ix, y - iy, z - iz
-        return dx * gradient[0] + dy * gradient[1] + dz * gradient[2]
+        return dx * gradient[..., 0] + dy * gradient[..., 1] + dz * gradient[..., 2]
 
     def _fade(self, t):
         return t * t * t * (t * (t * 6 - 15) + 10)
@@ -62,9 +89,18 @@ class PerlinNoise:
         return a + t * (b - a)
 
     def noise(self, x, y, z=None):
+        """
+        Perlin noise at the given coordinates. The coordinates can be scalars or arrays of
+        any (broadcastable) shape, e.g. a whole meshgrid.
+
+        Returns:
+        - float or np.ndarray: The noise value(s), a float when all coordinates are scalars.
+        """
+        is_scalar = np.ndim(x) == 0 and np.ndim(y) == 0 and np.ndim(z) == 0
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
         if z is None:
             # 2D noise
-            x0, y0 = int(np.floor(x)), int(np.floor(y))
+            x0, y0 = np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
             x1, y1 = x0 + 1, y0 + 1
 
             sx, sy = self._fade(x - x0), self._fade(y - y0)
@@ -77,10 +113,15 @@ class PerlinNoise:
             n1 = self._dot_grid_gradient(x1, y1, x, y)
             ix1 = self._lerp(n0, n1, sx)
 
-            return self._lerp(ix0, ix1, sy)
+            value = self._lerp(ix0, ix1, sy)
         else:
             # 3D noise
-            x0, y0, z0 = int(np.floor(x)), int(np.floor(y)), int(np.floor(z))
+            z = np.asarray(z, dtype=np.float64)
+            x0, y0, z0 = (
+                np.floor(x).astype(np.int64),
+                np.floor(y).astype(np.int64),
+                np.floor(z).astype(np.int64),
+            )
             x1, y1, z1 = x0 + 1, y0 + 1, z0 + 1
 
             sx, sy, sz = self._fade(x - x0), self._fade(y - y0), self._fade(z - z0)
@@ -102,9 +143,13 @@ class PerlinNoise:
             iy0 = self._lerp(ix00, ix10, sy)
             iy1 = self._lerp(ix01, ix11, sy)
 
-            return self._lerp(iy0, iy1, sz)
+            value = self._lerp(iy0, iy1, sz)
+        return float(value) if is_scalar else value
 
     def fractal_noise(self, x, y, z=None):
+        """
+        Sum of `octaves` layers of noise, evaluated for scalars or whole coordinate arrays.
+        """
         total = 0
         frequency = 1
         amplitude = 1
@@ -123,6 +168,32 @@ class PerlinNoise:
 
         return total / max_value
 
+    def _edge_factor(
+        self,
+        width: int,
+        height: int,
+        falloff_profile: Union[FalloffProfile, Callable[[np.ndarray], np.ndarray]],
+    ) -> np.ndarray:
+        """Helper function to compute the falloff for every pixel of a (height, width) mask at once."""
+        center_x, center_y = width // 2, height // 2
+        y, x = np.ogrid[0:height, 0:width]
+        if falloff_profile == FalloffProfile.ELLIPTICAL:
+            distance = np.sqrt(
+                ((x - center_x) / max(center_x, 1)) ** 2
+                + ((y - center_y) / max(center_y, 1)) ** 2
+            ) / np.sqrt(2)
+            return np.maximum(0, 1 - distance) ** self.falloff
+
+        max_distance = max(np.sqrt(center_x**2 + center_y**2), 1)
+        distance = np.sqrt((x - center_x) ** 2 + (y - center_y) ** 2)
+        if callable(falloff_profile):
+            return np.broadcast_to(
+                falloff_profile(distance / max_distance), (height, width)
+            )
+        if falloff_profile != FalloffProfile.RADIAL:
+            raise ValueError(f"Unknown falloff profile: {falloff_profile}")
+        return np.maximum(0, (max_distance - distance) / max_distance) ** self.falloff
+
     def generate_cloud_mask(
         self,
         width: int,
@@ -132,7 +203,24 @@ class PerlinNoise:
         persistence: Optional[Union[float, Tuple[float, float]]] = None,
         lacunarity: Optional[Union[float, Tuple[float, float]]] = None,
         falloff: Optional[Union[float, Tuple[float, float]]] = None,
+        falloff_profile: Optional[
+            Union[FalloffProfile, Callable[[np.ndarray], np.ndarray]]
+        ] = None,
     ) -> np.ndarray:
+        """
+        A method to generate a cloud shaped opacity mask.
+
+        Args:
+        - width (int): The width of the mask.
+        - height (int): The height of the mask.
+        - scale (Union[float, Tuple[float, float]], optional): The noise scale in pixels. Defaults to 10.
+        - octaves, persistence, lacunarity, falloff (optional): Override the noise's parameters. Defaults to None.
+        - falloff_profile (optional): A `FalloffProfile` or a callable mapping the normalized distance grid
+            (0 at the center, 1 at the corners) to an edge factor. Defaults to the noise's profile.
+
+        Returns:
+        - np.ndarray: The (height, width) uint8 mask.
+        """
 
         scale = self._resolve_param(scale)
         if octaves is not None:
@@ -148,28 +236,25 @@ class PerlinNoise:
             f"Generating cloud mask with scale: {scale}, octaves: {self.octaves}, persistence: {self.persistence}, lacunarity: {self.lacunarity}, falloff: {self.falloff}"
         )
 
-        cloud_mask = np.zeros((height, width), dtype=np.uint8)
-        for y in range(height):
-            for x in range(width):
-                if self.noise_dimension == 2:
-                    noise_value = self.fractal_noise(x / scale, y / scale)
-                elif self.noise_dimension == 3:
-                    noise_value = self.fractal_noise(
-                        x / scale, y / scale, self.random_state.uniform(0, 1)
-                    )
-                else:
-                    raise ValueError("noise_dimension must be 2 or 3")
-                normalized_value = (noise_value + 1) / 2
-                cloud_mask[y, x] = int(normalized_value * 255)
+        if self.noise_dimension not in (2, 3):
+            raise ValueError("noise_dimension must be 2 or 3")
+        y, x = np.mgrid[0:height, 0:width]
+        if self.noise_dimension == 2:
+            noise_value = self.fractal_noise(x / scale, y / scale)
+        else:
+            noise_value = self.fractal_noise(
+                x / scale,
+                y / scale,
+                self.random_state.uniform(0, 1, size=(height, width)),
+            )
+        normalized_value = (noise_value + 1) / 2
+        cloud_mask = np.clip(normalized_value * 255, 0, 255).astype(np.uint8)
 
-        center_x, center_y = width // 2, height // 2
-        max_distance = np.sqrt(center_x**2 + center_y**2)
-        for y in range(height):
-            for x in range(width):
-                distance_to_edge = max_distance - np.sqrt(
-                    (x - center_x) ** 2 + (y - center_y) ** 2
-                )
-                edge_factor = max(0, distance_to_edge / max_distance) ** self.falloff
-                cloud_mask[y, x] = int(cloud_mask[y, x] * edge_factor + 5)
+        edge_factor = self._edge_factor(
+            width,
+            height,
+            self.falloff_profile if falloff_profile is None else falloff_profile,
+        )
+        cloud_mask = np.clip(cloud_mask * edge_factor + 5, 0, 255)
 
         return cloud_mask.astype(np.uint8)
@@ -1,7 +1,7 @@
 from smokesim.base import BaseSim
-from smokesim.defs.particle import ParticleProperty
+from smokesim.defs.particle import ParticleProperty, ParticleSpec
 
-from typing import Union, Tuple, Optional, Callable
+from typing import Union, Tuple, Optional, Callable, List
 import numpy as np
 
 
@@ -108,3 +108,342 @@ class Particle(BaseSim):
         ):
             self.is_alive = False
             return None
+
+
+def _store_field(name: str):
+    """
+    A helper to expose one array of a `ParticleStore` as an attribute of a `ParticleView`.
+    """
+
+    def getter(self):
+        return getattr(self.store, name)[self.index]
+
+    def setter(self, value):
+        getattr(self.store, name)[self.index] = value
+
+    return property(getter, setter)
+
+
+class ParticleStore:
+    """
+    A structure-of-arrays container holding the state of many particles.
+
+    Every field of a `Particle` that changes during the simulation lives in a contiguous
+    NumPy array so that a whole smoke can be advanced with a handful of array operations.
+    Only the first `size` slots of each array are in use. When the particles of several smokes
+    share a store (see `SmokeBatch`), `batch` holds the index of every particle's smoke.
+    """
+
+    FIELDS = (
+        "x",
+        "y",
+        "vx",
+        "vy",
+        "startvx",
+        "startvy",
+        "age",
+        "lifetime",
+        "alpha",
+        "scale",
+        "scale_step",
+        "fade_speed",
+    )
+
+    def __init__(self, capacity: int = 64):
+        """
+        Args:
+        - capacity (int, optional): The number of slots allocated up front. Defaults to 64.
+        """
+        self.capacity = max(int(capacity), 1)
+        self.size = 0
+        for name in self.FIELDS:
+            setattr(self, name, np.zeros(self.capacity, dtype=np.float64))
+        self.color = np.zeros((self.capacity, 3), dtype=np.float64)
+        self.is_alive = np.zeros(self.capacity, dtype=bool)
+        self.sprite_paint = np.empty(self.capacity, dtype=object)
+        self.batch = np.zeros(self.capacity, dtype=np.int64)
+        self.default_particle_mask: "np.ndarray" = None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index: int) -> "ParticleView":
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("particle index out of range")
+        return ParticleView(self, index)
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield ParticleView(self, index)
+
+    def _reserve(self, capacity: int):
+        """
+        A method to grow every array so that it can hold at least `capacity` particles.
+        """
+        if capacity <= self.capacity:
+            return
+        new_capacity = max(capacity, 2 * self.capacity)
+        for name in self.FIELDS + ("color", "is_alive", "sprite_paint", "batch"):
+            old = getattr(self, name)
+            new = (
+                np.empty((new_capacity,) + old.shape[1:], dtype=object)
+                if old.dtype == object
+                else np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            )
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+        self.capacity = new_capacity
+
+    def add(self, particles: List[Particle]):
+        """
+        A method to copy the state of `Particle` objects into the store.
+
+        Args:
+        - particles (List[Particle]): The particles to add.
+        """
+        count = len(particles)
+        if count == 0:
+            return
+        self._reserve(self.size + count)
+        start, end = self.size, self.size + count
+        for name in self.FIELDS:
+            getattr(self, name)[start:end] = [getattr(p, name) for p in particles]
+        self.color[start:end] = [p.color for p in particles]
+        self.is_alive[start:end] = [p.is_alive for p in particles]
+        self.sprite_paint[start:end] = None
+        self.batch[start:end] = 0
+        self.size = end
+
+    def extend(self, store: "ParticleStore", batch: int = 0):
+        """
+        A method to copy the particles of another store to the end of this one.
+
+        Args:
+        - store (ParticleStore): The store to copy the particles of.
+        - batch (int, optional): The batch index of the copied particles. Defaults to 0.
+        """
+        count = len(store)
+        if count == 0:
+            return
+        self._reserve(self.size + count)
+        start, end = self.size, self.size + count
+        for name in self.FIELDS + ("color", "is_alive", "sprite_paint"):
+            getattr(self, name)[start:end] = getattr(store, name)[:count]
+        self.batch[start:end] = batch
+        self.size = end
+
+    def take(self, indices: np.ndarray) -> "ParticleStore":
+        """
+        A method to copy some of the particles into a new store.
+
+        Args:
+        - indices (np.ndarray): The indices of the particles, in the order of the new store.
+
+        Returns:
+        - ParticleStore: The new store, with the same default particle mask.
+        """
+        count = len(indices)
+        store = ParticleStore(capacity=count)
+        for name in self.FIELDS + ("color", "is_alive", "sprite_paint", "batch"):
+            getattr(store, name)[:count] = getattr(self, name)[indices]
+        store.size = count
+        store.default_particle_mask = self.default_particle_mask
+        return store
+
+    def spawn(
+        self,
+        count: int,
+        x: float,
+        y: float,
+        property: ParticleSpec,
+        random_generator: np.random.Generator,
+        batch: int = 0,
+    ):
+        """
+        A method to create `count` particles at once. The random parameters are drawn with one
+        vectorized call each and follow the same rules as `Particle.__init__`.
+
+        Args:
+        - count (int): The number of particles to create.
+        - x (float): The x coordinate of the particles.
+        - y (float): The y coordinate of the particles.
+        - property (ParticleSpec): The compiled properties of the particles.
+        - random_generator (np.random.Generator): The generator to draw the random parameters from.
+        - batch (int, optional): The batch index of the particles. Defaults to 0.
+        """
+        if count <= 0:
+            return
+        rng = random_generator
+        startvx = (
+            np.full(count, property.startvx, dtype=np.float64)
+            if property.startvx is not None
+            else rng.uniform(property.min_vx, property.max_vx, count)
+        )
+        startvy = (
+            np.full(count, property.startvy, dtype=np.float64)
+            if property.startvy is not None
+            else rng.uniform(property.min_vy, property.max_vy, count)
+        )
+        scale = (
+            np.full(count, property.smoke_sprite_size, dtype=np.float64)
+            if property.scale is not None
+            else np.trunc(rng.uniform(property.min_scale, property.max_scale, count))
+        )
+        lifetime = (
+            np.full(count, property.lifetime, dtype=np.float64)
+            if property.lifetime is not None
+            else rng.uniform(property.min_lifetime, property.max_lifetime, count)
+        )
+        final_scale = rng.uniform(
+            scale * property.scale_range[0], scale * property.scale_range[1]
+        )
+
+        self._reserve(self.size + count)
+        start, end = self.size, self.size + count
+        self.x[start:end] = x
+        self.y[start:end] = y
+        self.startvx[start:end] = startvx
+        self.startvy[start:end] = startvy
+        self.vx[start:end] = startvx
+        self.vy[start:end] = startvy
+        self.age[start:end] = property.age
+        self.lifetime[start:end] = lifetime
+        self.alpha[start:end] = property.alpha
+        self.scale[start:end] = scale
+        self.scale_step[start:end] = (final_scale - scale) / lifetime
+        self.fade_speed[start:end] = property.fade_speed
+        self.color[start:end] = property.color
+        self.is_alive[start:end] = True
+        self.sprite_paint[start:end] = None
+        self.batch[start:end] = batch
+        self.size = end
+
+    def _keep(self, keep: np.ndarray):
+        """
+        A method to move the slots listed in `keep` to the front of every array, in order.
+        """
+        count = len(keep)
+        for name in self.FIELDS + ("color", "is_alive", "sprite_paint", "batch"):
+            array = getattr(self, name)
+            array[:count] = array[keep]
+        self.sprite_paint[count : self.size] = None
+        self.is_alive[count : self.size] = False
+        self.size = count
+
+    def compact(self) -> int:
+        """
+        A method to remove dead particles, keeping the living ones contiguous and in spawn order.
+
+        Returns:
+        - int: The number of removed particles.
+        """
+        n = self.size
+        keep = np.flatnonzero(self.is_alive[:n])
+        if len(keep) < n:
+            self._keep(keep)
+        return n - self.size
+
+    def drop_oldest(self, count: int):
+        """
+        A method to remove the `count` oldest particles.
+
+        Args:
+        - count (int): The number of particles to remove.
+        """
+        count = min(max(int(count), 0), self.size)
+        if count:
+            self._keep(np.arange(count, self.size))
+
+    def clear(self):
+        """
+        A method to remove every particle from the store.
+        """
+        self.sprite_paint[: self.size] = None
+        self.is_alive[: self.size] = False
+        self.size = 0
+
+    def cull(self, width: float, height: float) -> int:
+        """
+        A method to mark the living particles outside of the (0, 0, width, height) screen as not
+        alive, like drawing them does.
+
+        Args:
+        - width (float): The width of the screen.
+        - height (float): The height of the screen.
+
+        Returns:
+        - int: The number of culled particles.
+        """
+        n = self.size
+        x, y = self.x[:n], self.y[:n]
+        outside = self.is_alive[:n] & ((x < 0) | (x > width) | (y < 0) | (y > height))
+        self.is_alive[:n] &= ~outside
+        return int(np.count_nonzero(outside))
+
+    def update(self, time_step: float = 1):
+        """
+        A method to update every particle in the store at once. Same rules as `Particle.update`.
+
+        Args:
+        - time_step (float, optional): The time_step to update the particles by. Defaults to 1.
+        """
+        n = self.size
+        if n == 0:
+            return
+        age, lifetime = self.age[:n], self.lifetime[:n]
+        age += time_step
+        self.x[:n] += self.vx[:n] * time_step
+        self.y[:n] += self.vy[:n] * time_step
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.sqrt(age / lifetime)
+        np.multiply(1 - frac, self.startvy[:n], out=self.vy[:n])
+        np.multiply(1 - frac, self.startvx[:n], out=self.vx[:n])
+        size = self.scale[:n] + age * self.scale_step[:n]
+        self.alpha[:n] -= self.fade_speed[:n]
+
+        dead = (
+            (self.alpha[:n] < 0) | (age > lifetime) | (self.scale[:n] < 1) | (size < 0)
+        )
+        self.is_alive[:n] &= ~dead
+
+
+class ParticleView:
+    """
+    A lightweight, `Particle`-like handle to one slot of a `ParticleStore`.
+    Reading or writing its attributes reads or writes the store's arrays.
+    """
+
+    __slots__ = ("store", "index")
+
+    x = _store_field("x")
+    y = _store_field("y")
+    vx = _store_field("vx")
+    vy = _store_field("vy")
+    startvx = _store_field("startvx")
+    startvy = _store_field("startvy")
+    age = _store_field("age")
+    lifetime = _store_field("lifetime")
+    alpha = _store_field("alpha")
+    scale = _store_field("scale")
+    scale_step = _store_field("scale_step")
+    fade_speed = _store_field("fade_speed")
+    is_alive = _store_field("is_alive")
+    sprite_paint = _store_field("sprite_paint")
+
+    def __init__(self, store: ParticleStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def color(self):
+        return tuple(int(c) for c in self.store.color[self.index])
+
+    @property
+    def position(self):
+        return (self.x, self.y)
+
+    @property
+    def default_particle_mask(self):
+        return self.store.default_particle_mask
@@ -1,21 +1,37 @@
-from smokesim.particle import Particle
-from smokesim.defs import Sprite, ParticleProperty, SmokeProperty
+from smokesim.particle import ParticleStore, ParticleView
+from smokesim.defs import (
+    Sprite,
+    ParticleProperty,
+    ParticleSpec,
+    SmokeProperty,
+    OverflowPolicy,
+)
 from smokesim.base import BaseSim
-from smokesim.engine import EngineTypes, Engine
+from smokesim.engine import EngineTypes, Engine, resize_nearest
 from smokesim.noise import PerlinNoise
+from smokesim.mask_bank import MaskBank
+from smokesim.sprite_cache import SpriteCache
+from smokesim.splat import Renderer, DensitySplat
 from smokesim.defs.constants import CLOUD_MASK
 
-from typing import Tuple, List, Optional
+from typing import Tuple, List, Optional, Sequence
 import numpy as np
 
 
 class Smoke(BaseSim):
-    def __init__(self, smoke_property: SmokeProperty):
+    def __init__(
+        self,
+        smoke_property: SmokeProperty,
+        mask_bank: Optional[MaskBank] = None,
+        mask_cache: Optional[SpriteCache] = None,
+    ):
         """
         Class to represent a smoke object. Smoke is made up of particles.
 
         Args:
         - smoke_property (SmokeProperty): The properties of the smoke.
+        - mask_bank (Optional[MaskBank], optional): Pick Perlin masks from this bank instead of generating them. Defaults to None.
+        - mask_cache (Optional[SpriteCache], optional): Reuse the Perlin masks generated for earlier smokes from this cache. Defaults to None.
 
         """
         super().__init__(smoke_property)
@@ -26,25 +42,43 @@ class Smoke(BaseSim):
         self.sprite_size = smoke_property.sprite_size
         self.lifetime = smoke_property.lifetime
         self.age = smoke_property.age
-        self.particles: List[Particle] = []
+        self.particles = ParticleStore(capacity=self.particle_count)
         self.particles_until_now = 0
+        self.emissions = 0
+        # The smoke machine step the smoke was added at
+        self.start_step = 0
         self.particle_property = smoke_property.particle_property
+        self.particle_spec = self.compile_particle_spec(self.particle_property)
+        self.max_particles = smoke_property.max_particles
+        self.overflow_policy = smoke_property.overflow_policy
         smoke_property.use_perlin_rate = min(max(smoke_property.use_perlin_rate, 0), 1)
 
         if smoke_property.use_perlin_rate > self.random_state.random():
-            self.noise = PerlinNoise(
-                seed=self.random_state.randint(0, 100) * self.id,
-                octaves=(1, 8),
-                persistence=(0.2, 5.8),
-                lacunarity=(0.5, 10.0),
-            )
-            self.default_particle_mask = self.noise.generate_cloud_mask(
-                width=self.sprite_size,
-                height=self.sprite_size,
-                scale=self.sprite_size,
-            )
+            noise_seed = self.random_state.randint(0, 100) * self.id
+            if mask_bank is not None:
+                self.default_particle_mask = mask_bank.pick(noise_seed)
+            else:
+                # The mask only depends on the noise seed and the sprite size
+                key = ("perlin", noise_seed, self.sprite_size)
+                mask = mask_cache.get(key) if mask_cache is not None else None
+                if mask is None:
+                    self.noise = PerlinNoise(
+                        seed=noise_seed,
+                        octaves=(1, 8),
+                        persistence=(0.2, 5.8),
+                        lacunarity=(0.5, 10.0),
+                    )
+                    mask = self.noise.generate_cloud_mask(
+                        width=self.sprite_size,
+                        height=self.sprite_size,
+                        scale=self.sprite_size,
+                    )
+                    if mask_cache is not None:
+                        mask_cache.put(key, mask, mask.nbytes)
+                self.default_particle_mask = mask
         else:
             self.default_particle_mask = CLOUD_MASK
+        self.particles.default_particle_mask = self.default_particle_mask
         self.create_particles(self.particle_property)
 
     def create_particles(self, particle_property: Optional[ParticleProperty] = None):
@@ -54,44 +88,206 @@ class Smoke(BaseSim):
         Args:
         - particle_property (Optional[ParticleProperty], optional): The properties of the particles. Defaults to None.
         """
-        particles = []
-        for p in range(self.particle_count):
-            particle_id = f"{self.id}_{self.particles_until_now}"
-            x, y = self.origin
-            if particle_property:
-                particle_property.random_seed = self.random_state.randint(0, 100000)
-            else:
-                particle_property = ParticleProperty(
-                    color=self.color, smoke_sprite_size=self.sprite_size
-                )
-                particle_property.random_seed = self.random_state.randint(0, 100000)
+        count = self.emission_count()
+        if particle_property is self.particle_property:
+            particle_spec = self.particle_spec
+        else:
+            particle_spec = self.compile_particle_spec(particle_property)
+        x, y = self.origin
+        self.particles.spawn(
+            count, x, y, particle_spec, self.emission_generator(self.emissions)
+        )
+        self.particles_until_now += count
+        self.emissions += 1
+
+    def compile_particle_spec(
+        self, particle_property: Optional[ParticleProperty] = None
+    ) -> ParticleSpec:
+        """
+        A method to compile the particle property the smoke spawns particles from.
+
+        Args:
+        - particle_property (Optional[ParticleProperty], optional): The properties of the particles. Defaults to None (the smoke's color and sprite size).
+
+        Returns:
+        - ParticleSpec: The compiled spec.
+        """
+        if particle_property is None:
+            particle_property = ParticleProperty(
+                color=self.color, smoke_sprite_size=self.sprite_size
+            )
+        return particle_property.compile()
+
+    def emission_generator(self, emission: int) -> np.random.Generator:
+        """
+        A method to get the random generator of one emission. It only depends on the smoke's
+        random seed and the emission's index, so every run with the same seed spawns the same particles.
+
+        Args:
+        - emission (int): The index of the emission.
+
+        Returns:
+        - np.random.Generator: The generator to draw the particles' parameters from.
+        """
+        return np.random.default_rng([self.property.random_seed, emission])
+
+    def state_at(
+        self,
+        step: int,
+        time_step: float = 30,
+        screen_dim: Optional[Tuple[int, int]] = None,
+    ) -> ParticleStore:
+        """
+        A method to evaluate the particles of the smoke after `step` updates of `time_step`
+        directly from their spawn parameters, without simulating the steps before. The smoke
+        itself is not changed.
+
+        A particle's velocity only depends on its age, so its position is its origin plus a
+        sum over the ages it went through, which is read from one cumulative table per smoke.
+        Alpha and age are linear in the number of updates. The result matches the stepped
+        simulation up to floating point rounding of the positions.
 
-            particle_property.id = particle_id
-            particle = Particle(x, y, particle_property)
+        Args:
+        - step (int): The number of updates since the smoke was created.
+        - time_step (float, optional): The time step of every update. Defaults to 30.
+        - screen_dim (Optional[Tuple[int, int]], optional): The (width, height) of the screen. If given, particles that went out of it in an earlier step are not alive, like drawing or culling every step does. Defaults to None.
 
-            particles.append(particle)
-            self.particles_until_now += 1
-        self.particles.extend(particles)
+        Returns:
+        - ParticleStore: The particles right after the update of `step`, before it is drawn or culled. Only living particles are kept.
+        """
+        if self.max_particles is not None:
+            raise ValueError(
+                "state_at needs a smoke without max_particles, capping makes the state depend on the history."
+            )
+        store = ParticleStore(capacity=self.particle_count)
+        store.default_particle_mask = self.default_particle_mask
+        step = int(step)
+        age = self.property.age + step * time_step
+        if step < 0 or (self.lifetime > 0 and age > self.lifetime):
+            return store
+
+        # Only the last emissions can still have living particles
+        spec = self.particle_spec
+        max_lifetime = spec.lifetime if spec.lifetime is not None else spec.max_lifetime
+        max_updates = int(np.floor((max_lifetime - spec.age) / time_step))
+        if spec.fade_speed > 0:
+            max_updates = min(max_updates, int(spec.alpha // spec.fade_speed))
+        first = max(step - max(max_updates, 0), 0)
+        store._reserve((step - first + 1) * self.particle_count)
+        x, y = self.origin
+        emissions = []
+        for emission in range(first, step + 1):
+            start = len(store)
+            store.spawn(
+                self.particle_count,
+                x,
+                y,
+                spec,
+                self.emission_generator(emission),
+            )
+            emissions.append(np.full(len(store) - start, emission))
+        n = len(store)
+        if n == 0:
+            return store
+        emissions = np.concatenate(emissions)
+        # The number of updates every particle went through
+        m = (step - emissions).astype(np.float64)
+
+        # displacement(k) / startv = time_step * (k - sum_{j=1}^{k-1} sqrt(age_j) / sqrt(lifetime))
+        ages = spec.age + np.arange(1, step - first + 1) * time_step
+        root_sums = np.concatenate(([0.0, 0.0], np.cumsum(np.sqrt(ages))))
+        lifetime = store.lifetime[:n]
+        root_lifetime = np.sqrt(lifetime)
+
+        def displacement(k: np.ndarray) -> np.ndarray:
+            k_index = np.maximum(k, 0).astype(np.intp)
+            return time_step * (k - root_sums[k_index] / root_lifetime)
+
+        moved = m >= 1
+        offset = np.where(moved, displacement(m), 0.0)
+        store.x[:n] += store.startvx[:n] * offset
+        store.y[:n] += store.startvy[:n] * offset
+        particle_age = spec.age + m * time_step
+        store.age[:n] = particle_age
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(moved, np.sqrt(particle_age / lifetime), 0.0)
+        store.vx[:n] = (1 - frac) * store.startvx[:n]
+        store.vy[:n] = (1 - frac) * store.startvy[:n]
+        store.alpha[:n] -= m * store.fade_speed[:n]
+
+        scale = store.scale[:n]
+        dead = moved & (
+            (store.alpha[:n] < 0)
+            | (particle_age > lifetime)
+            | (scale < 1)
+            | (scale + particle_age * store.scale_step[:n] < 0)
+        )
+        if screen_dim is not None:
+            # Living particles move monotonically, so they left the screen in an earlier step
+            # if they were out of it at the first or at the previous check. Particles of the
+            # first emission are checked from their first update on, later ones from their spawn.
+            width, height = screen_dim
+            first_check = np.where(emissions == 0, 1.0, 0.0)
+            culled = np.zeros(n, dtype=bool)
+            for k in (first_check, m - 1):
+                offset = np.where(k >= 1, displacement(k), 0.0)
+                px = x + store.startvx[:n] * offset
+                py = y + store.startvy[:n] * offset
+                out = (px < 0) | (px > width) | (py < 0) | (py > height)
+                culled |= (k >= first_check) & (k <= m - 1) & out
+            dead |= culled
+        store.is_alive[:n] = ~dead
+        store.compact()
+        return store
+
+    def emission_count(self) -> int:
+        """
+        A method to find how many particles the next emission may add without exceeding
+        `max_particles`. With `OverflowPolicy.DROP_OLDEST` it also makes room in the pool.
+
+        Returns:
+        - int: The number of particles to emit.
+        """
+        count, drop = self.emission_plan(len(self.particles))
+        if drop:
+            self.particles.drop_oldest(drop)
+        return count
+
+    def emission_plan(self, pool_size: int) -> Tuple[int, int]:
+        """
+        A method to find how many particles the next emission may add to a pool of `pool_size`
+        particles without exceeding `max_particles`, and how many of the oldest ones to drop first.
+
+        Args:
+        - pool_size (int): The number of particles of the smoke.
+
+        Returns:
+        - int: The number of particles to emit.
+        - int: The number of oldest particles to drop (only with `OverflowPolicy.DROP_OLDEST`).
+        """
+        count = self.particle_count
+        if self.max_particles is None:
+            return count, 0
+        count = min(count, max(self.max_particles, 0))
+        overflow = pool_size + count - self.max_particles
+        if overflow > 0:
+            if self.overflow_policy == OverflowPolicy.SKIP:
+                return count - overflow, 0
+            return count, overflow
+        return count, 0
 
     def update(self, time_step: float = 30):
         """
-        A method to update the smoke.
+        A method to update the smoke. Dead particles are removed from the pool before new ones are emitted.
 
         Args:
         - time_step (float, optional): The time_step to update the smoke by. Defaults to 30.
         """
         self.age += time_step
-        new_particles = []
-        for particle in self.particles:
-            particle.update(time_step)
-            if particle.is_alive:
-                new_particles.append(particle)
-            else:
-                del particle
+        self.particles.update(time_step)
+        self.particles.compact()
         if self.lifetime > 0 and self.age > self.lifetime:
-            for p in self.particles:
-                del p
-            self.particles = []
+            self.particles.clear()
         else:
             self.create_particles(self.particle_property)
 
@@ -105,12 +301,36 @@ class SmokeMachine:
         default_sprite_size: int = 20,
         random_seed: int = 100,
         versbose: bool = False,
+        mask_bank: Optional[MaskBank] = None,
+        sprite_cache_bytes: int = 64 * 2**20,
+        scale_quantum: float = 1,
+        renderer: Renderer = Renderer.SPRITES,
+        extinction: float = 1.0,
+        splat_quantum: int = 4,
     ):
+        """
+        Class to emit, update and draw smokes.
+
+        Args:
+        - engine_type (EngineTypes, optional): The engine type. Defaults to EngineTypes.PYGAME.
+        - default_particle_count (int, optional): The particle count of smokes that do not set one. Defaults to 100.
+        - default_color (Tuple[int, int, int], optional): The color of smokes that do not set one. Defaults to (24, 46, 48).
+        - default_sprite_size (int, optional): The sprite size of smokes that do not set one. Defaults to 20.
+        - random_seed (int, optional): The random seed. Defaults to 100.
+        - versbose (bool, optional): Whether to print added smokes. Defaults to False.
+        - mask_bank (Optional[MaskBank], optional): Pick Perlin masks from this bank instead of generating them. Defaults to None.
+        - sprite_cache_bytes (int, optional): The memory budget of the shared sprite cache. Defaults to 64 MiB.
+        - scale_quantum (float, optional): Sprite sizes are rounded down to a multiple of this, so particles of similar size share a sprite. Defaults to 1.
+        - renderer (Renderer, optional): Draw a sprite per particle, or splat the particles into a density grid (`DensitySplat`) drawn as one image. Defaults to Renderer.SPRITES.
+        - extinction (float, optional): How opaque a unit of splatted density is. Defaults to 1.0.
+        - splat_quantum (int, optional): Splatted sprite sizes are rounded to a multiple of this, every size is one convolution. Defaults to 4.
+        """
         self.engine_type = engine_type
         self.color = default_color
         self.sprite_size = default_sprite_size
         self.particle_count = default_particle_count
         self.time_step = 0
+        self.steps = 0
         self.smokes: List[Smoke] = []
         self.last_smoke_id = -1
         self.random_seed = random_seed
@@ -118,6 +338,15 @@ class SmokeMachine:
         self.verbose = versbose
         self.default_sprite = None
         self.default_smoke_property = SmokeProperty()
+        self.mask_bank = mask_bank
+        self.sprite_cache = SpriteCache(sprite_cache_bytes)
+        self.scale_quantum = scale_quantum
+        self.renderer = Renderer(renderer)
+        self.extinction = extinction
+        self.splat_quantum = splat_quantum
+        # Particles drawn and culled before drawing in the last frame
+        self.drawn_particles = 0
+        self.culled_particles = 0
 
     def add_smoke(self, smoke_property: SmokeProperty):
         """
@@ -126,31 +355,93 @@ class SmokeMachine:
         Args:
         - smoke_property: SmokeProperty, object containing the properties of the smoke.
         """
-        # if the propert are default, then use from the smoke's property
-        if self.default_smoke_property.color == smoke_property.color:
+        # if the properties were not given, then use the smoke machine's defaults
+        fields_set = smoke_property.model_fields_set
+        if "color" not in fields_set:
             smoke_property.color = self.color
-        if self.default_smoke_property.sprite_size == smoke_property.sprite_size:
+        if "sprite_size" not in fields_set:
             smoke_property.sprite_size = self.sprite_size
-        if self.default_smoke_property.particle_count == smoke_property.particle_count:
+        if "particle_count" not in fields_set:
             smoke_property.particle_count = self.particle_count
-        if self.default_smoke_property.id == smoke_property.id:
+        if "id" not in fields_set:
             smoke_property.id = self.last_smoke_id + 1
-        if self.default_smoke_property.random_seed == smoke_property.random_seed:
+        if "random_seed" not in fields_set:
             smoke_property.random_seed = self.random_seed
-        if (
-            self.default_smoke_property.particle_property
-            == smoke_property.particle_property
-        ):
+        if "particle_property" not in fields_set and smoke_property.particle_property:
             smoke_property.particle_property.random_seed = self.random_seed
-        if self.default_smoke_property.lifetime == smoke_property.lifetime:
+        if "lifetime" not in fields_set:
             smoke_property.lifetime = -1
-        smoke = Smoke(smoke_property)
+        smoke = Smoke(
+            smoke_property, mask_bank=self.mask_bank, mask_cache=self.sprite_cache
+        )
+        smoke.start_step = self.steps
         self.smokes.append(smoke)
 
         self.last_smoke_id += 1
         if self.verbose:
             print(f"Added smoke with id: {smoke.id}, particles: {len(smoke.particles)}")
 
+    def copy(self, random_seed: Optional[int] = None) -> "SmokeMachine":
+        """
+        A method to make a new smoke machine with the same settings and smokes, restarted from
+        their initial state. With `random_seed`, every smoke is reseeded from it and its id.
+
+        Args:
+        - random_seed (Optional[int], optional): The new random seed. Defaults to None (keep the seeds).
+
+        Returns:
+        - SmokeMachine: The new smoke machine.
+        """
+        seed = self.random_seed if random_seed is None else random_seed
+        machine = SmokeMachine(
+            engine_type=self.engine_type,
+            default_particle_count=self.particle_count,
+            default_color=self.color,
+            default_sprite_size=self.sprite_size,
+            random_seed=seed,
+            versbose=self.verbose,
+            mask_bank=self.mask_bank,
+        )
+        machine.default_sprite = self.default_sprite
+        machine.scale_quantum = self.scale_quantum
+        machine.renderer = self.renderer
+        machine.extinction = self.extinction
+        machine.splat_quantum = self.splat_quantum
+        # Copies draw the same masks and colors, so they share the sprites
+        machine.sprite_cache = self.sprite_cache
+        for smoke in self.smokes:
+            smoke_property = smoke.property.model_copy(deep=True)
+            if random_seed is not None:
+                smoke_property.random_seed = int(
+                    np.random.SeedSequence([seed, smoke.id]).generate_state(1)[0]
+                )
+            copy = Smoke(
+                smoke_property, mask_bank=self.mask_bank, mask_cache=self.sprite_cache
+            )
+            copy.start_step = smoke.start_step
+            machine.smokes.append(copy)
+        machine.last_smoke_id = self.last_smoke_id
+        return machine
+
+    def reset(self, random_seed: Optional[int] = None):
+        """
+        A method to remove every smoke and restart the machine, optionally with a new random
+        seed. The sprite cache, with the Perlin masks it holds, is kept for the next smokes.
+
+        Args:
+        - random_seed (Optional[int], optional): The new random seed. Defaults to None (keep the seed).
+        """
+        for smoke in self.smokes:
+            smoke.particles.clear()
+        self.smokes = []
+        self.last_smoke_id = -1
+        self.time_step = 0
+        self.steps = 0
+        if random_seed is not None:
+            self.random_seed = random_seed
+        self.random_state = np.random.RandomState(self.random_seed)
+        self.drawn_particles = self.culled_particles = 0
+
     def empty(self):
         """
         A method to empty the smoke machine.
@@ -158,11 +449,7 @@ class SmokeMachine:
         print("Emptying smoke")
         for s in self.smokes:
             s.age = s.lifetime
-            for p in s.particles:
-                p.age = p.lifetime
-
-                del p
-            del s
+            s.particles.clear()
         self.smokes = []
 
     def update(self, time_step: float = 30):
@@ -173,61 +460,257 @@ class SmokeMachine:
         - time_step (float, optional): The time_step to update the smoke machine by. Defaults to 30.
         """
         self.time_step += time_step
+        self.steps += 1
         new_smokes = []
         for smoke in self.smokes:
             smoke.update(time_step)
             if smoke.age > smoke.lifetime and smoke.lifetime > 0:
-                for p in smoke.particles:
-                    p.age = p.lifetime
-                    del p
-                del smoke
+                smoke.particles.clear()
             else:
                 new_smokes.append(smoke)
         self.smokes = new_smokes
 
-    def draw(self, screen, engine: Engine):
+    def cull(self, screen_dim: Tuple[int, int]) -> int:
+        """
+        A method to mark the particles that went out of the screen as not alive without drawing them.
+        Drawing does the same, so steps that are only simulated match drawn ones.
+
+        Args:
+        - screen_dim (Tuple[int, int]): The (width, height) of the screen.
+
+        Returns:
+        - int: The number of culled particles.
+        """
+        return sum(smoke.particles.cull(*screen_dim) for smoke in self.smokes)
+
+    def draw(
+        self,
+        screen,
+        engine: Engine,
+        layer: bool = False,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+    ):
         """
-        A method to draw the smoke machine.
+        A method to draw the smoke machine. Particles whose sprite does not intersect the screen
+        (or `roi`) are culled before drawing, `drawn_particles` and `culled_particles` count them.
 
         Args:
         - screen: The screen to draw the smoke machine on.
         - engine: The engine instance to handle rendering.
+        - layer (bool, optional): Whether `screen` is a layer made by `Engine.make_layer`. Defaults to False.
+        - roi (Optional[Tuple[int, int, int, int]], optional): The (x, y, width, height) region to draw. Defaults to None (the whole screen).
         """
+        self.drawn_particles = self.culled_particles = 0
+        if self.renderer == Renderer.SPLAT and self.default_sprite is None:
+            particles = [smoke.particles for smoke in self.smokes]
+            self.draw_splat(particles, screen, engine, layer=layer, roi=roi)
+            return
         for smoke in self.smokes:
-            self.draw_smoke(smoke, screen, engine)
+            self.draw_smoke(smoke, screen, engine, layer=layer, roi=roi)
 
-    def make_sprite(self, particle: Particle, engine) -> object:
+    def visible_particles(
+        self,
+        particles: ParticleStore,
+        engine: Engine,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+    ) -> np.ndarray:
+        """
+        A method to find the living particles whose sprite rectangle intersects the screen or `roi`.
+
+        Args:
+        - particles (ParticleStore): The particles.
+        - engine: The engine instance to handle rendering.
+        - roi (Optional[Tuple[int, int, int, int]], optional): The (x, y, width, height) region. Defaults to None (the whole screen).
+
+        Returns:
+        - np.ndarray: The indices of the visible particles, in drawing order.
+        """
+        n = len(particles)
+        left, top, width, height = (
+            (0, 0) + tuple(engine.screen_dim) if roi is None else roi
+        )
+        # Sprites are blitted at the truncated position
+        x = np.trunc(particles.x[:n])
+        y = np.trunc(particles.y[:n])
+        if self.default_sprite is None:
+            sprite_width = sprite_height = self.sprite_sizes(particles)
+        else:
+            sprite_width, sprite_height = engine.image_size(self.default_sprite)
+        visible = (
+            particles.is_alive[:n]
+            & (x < left + width)
+            & (x + sprite_width > left)
+            & (y < top + height)
+            & (y + sprite_height > top)
+        )
+        return np.flatnonzero(visible)
+
+    def render_at(
+        self,
+        step: int,
+        screen,
+        engine: Engine,
+        time_step: float = 30,
+        layer: bool = False,
+    ):
+        """
+        A method to draw the smokes as they are at machine step `step`, evaluated in closed form
+        with `Smoke.state_at` from their initial state. Neither the smokes nor the machine are
+        stepped, so any frame of a sequence can be drawn on its own.
+
+        Args:
+        - step (int): The number of machine updates.
+        - screen: The screen to draw the smokes on.
+        - engine: The engine instance to handle rendering.
+        - time_step (float, optional): The time step of every update. Defaults to 30.
+        - layer (bool, optional): Whether `screen` is a layer made by `Engine.make_layer`. Defaults to False.
+        """
+        self.drawn_particles = self.culled_particles = 0
+        splat = self.renderer == Renderer.SPLAT and self.default_sprite is None
+        stores = []
+        for smoke in self.smokes:
+            if step < smoke.start_step:
+                continue
+            particles = smoke.state_at(
+                step - smoke.start_step, time_step, engine.screen_dim
+            )
+            if splat:
+                stores.append(particles)
+            else:
+                self.draw_smoke(smoke, screen, engine, layer=layer, particles=particles)
+        if splat:
+            self.draw_splat(stores, screen, engine, layer=layer)
+
+    def sprite_sizes(self, particles: ParticleStore) -> np.ndarray:
+        """
+        A method to get the sprite size of every particle: its current size
+        (`scale + age * scale_step`) rounded down to a multiple of `scale_quantum`, at least 1.
+
+        Args:
+        - particles (ParticleStore): The particles.
+
+        Returns:
+        - np.ndarray: The int sprite sizes.
+        """
+        n = len(particles)
+        size = particles.scale[:n] + particles.age[:n] * particles.scale_step[:n]
+        quantum = self.scale_quantum
+        size = np.floor(size / quantum) * quantum if quantum > 0 else size
+        return np.maximum(size.astype(np.int64), 1)
+
+    def cached_sprite(
+        self,
+        mask: np.ndarray,
+        color: Tuple[int, int, int],
+        size: int,
+        engine: Engine,
+    ) -> object:
+        """
+        A method to get a sprite from the sprite cache, painting it on a miss.
+
+        Args:
+        - mask (np.ndarray): The opacity mask.
+        - color (Tuple[int, int, int]): The color.
+        - size (int): The width and height.
+        - engine: The engine instance to handle rendering.
+
+        Returns:
+        - The sprite object (Pygame Surface, PIL Image or NumPy array).
+        """
+        key = (engine.engine_type, id(mask), color, size)
+        sprite_paint = self.sprite_cache.get(key)
+        if sprite_paint is None:
+            sprite_paint = engine.paint_sprite(
+                Sprite(color=color, width=size, height=size, opacity_mask=mask)
+            )
+            self.sprite_cache.put(
+                key, sprite_paint, engine.image_nbytes(sprite_paint), owner=mask
+            )
+        return sprite_paint
+
+    def alpha_sprite(self, sprite: object, alpha: int, engine: Engine) -> object:
+        """
+        A method to get a copy of a sprite with `alpha` applied from the sprite cache, making it
+        with `Engine.with_alpha` on a miss. The sprite itself is never modified.
+
+        Args:
+        - sprite (object): The sprite.
+        - alpha (int): The opacity of the whole sprite in [0, 255].
+        - engine: The engine instance to handle rendering.
+
+        Returns:
+        - The sprite object with the alpha applied.
+        """
+        key = (engine.engine_type, "alpha", id(sprite), alpha)
+        sprite_alpha = self.sprite_cache.get(key)
+        if sprite_alpha is None:
+            sprite_alpha = engine.with_alpha(sprite, alpha)
+            self.sprite_cache.put(
+                key, sprite_alpha, engine.image_nbytes(sprite_alpha), owner=sprite
+            )
+        return sprite_alpha
+
+    def splat_kernel(self, mask: np.ndarray, size: int) -> np.ndarray:
+        """
+        A method to get the splat kernel of a mask at a size from the sprite cache, making it on a miss.
+
+        Args:
+        - mask (np.ndarray): The opacity mask.
+        - size (int): The width and height.
+
+        Returns:
+        - np.ndarray: The (size, size) float32 opacity in [0, 1].
+        """
+        key = ("splat", id(mask), size)
+        kernel = self.sprite_cache.get(key)
+        if kernel is None:
+            kernel = resize_nearest(mask, (size, size)) / np.float32(255)
+            self.sprite_cache.put(key, kernel, kernel.nbytes, owner=mask)
+        return kernel
+
+    def make_sprite(
+        self, particle: ParticleView, engine, size: Optional[int] = None
+    ) -> object:
         """
         A method to make a sprite.
 
         Args:
-        - particle (Particle): The particle to create a sprite for.
+        - particle (ParticleView): The particle to create a sprite for.
         - engine: The engine instance to handle rendering.
+        - size (Optional[int], optional): The width and height. Defaults to None (the particle's scale).
 
         Returns:
-        - The sprite object (Pygame Surface or PIL Image).
+        - The sprite object (Pygame Surface, PIL Image or NumPy array).
         """
+        size = int(particle.scale) if size is None else int(size)
         sprite = Sprite(
             color=particle.color,
-            width=particle.scale,
-            height=particle.scale,
-            mask=particle.default_particle_mask,
+            width=size,
+            height=size,
+            opacity_mask=particle.default_particle_mask,
         )
 
         if engine.engine_type == EngineTypes.PYGAME:
             sprite_paint = engine.paint_sprite(sprite)
         elif engine.engine_type == EngineTypes.PIL:
             sprite_paint = engine.paint_sprite(sprite)
+        elif engine.engine_type == EngineTypes.NUMPY:
+            sprite_paint = engine.paint_sprite(sprite)
+        elif engine.engine_type == EngineTypes.OPENCV:
+            sprite_paint = engine.paint_sprite(sprite)
         return sprite_paint
 
-    def draw_particle(self, particle: Particle, screen, engine: Engine):
+    def draw_particle(
+        self, particle: ParticleView, screen, engine: Engine, layer: bool = False
+    ):
         """
         A method to draw a particle.
 
         Args:
-        - particle (Particle): The particle to draw.
+        - particle (ParticleView): The particle to draw.
         - screen: The screen to draw the particle on.
         - engine: The engine instance to handle rendering.
+        - layer (bool, optional): Whether `screen` is a layer made by `Engine.make_layer`. Defaults to False.
         """
         if particle.is_alive:
             if particle.sprite_paint is None:
@@ -236,10 +719,12 @@ class SmokeMachine:
                 raise ValueError(
                     "sprite_paint is None. Ensure make_sprite is working correctly."
                 )
-            if engine.engine_type == EngineTypes.PYGAME:
-                particle.sprite_paint.set_alpha(particle.alpha)
             engine.blit(
-                screen, particle.sprite_paint, (int(particle.x), int(particle.y))
+                screen,
+                particle.sprite_paint,
+                (int(particle.x), int(particle.y)),
+                alpha=int(particle.alpha),
+                layer=layer,
             )
 
             # Mark particle as not alive if it goes out of bounds
@@ -251,19 +736,266 @@ class SmokeMachine:
             ):
                 particle.is_alive = False
 
-    def draw_smoke(self, smoke: Smoke, screen, engine: Engine):
+    def draw_smoke(
+        self,
+        smoke: Smoke,
+        screen,
+        engine: Engine,
+        layer: bool = False,
+        particles: Optional[ParticleStore] = None,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+    ):
         """
-        A method to draw a smoke.
+        A method to draw a smoke. Only the particles whose sprite intersects the screen (or `roi`)
+        are drawn, then the particles out of the screen are marked as not alive.
 
         Args:
         - smoke (Smoke): The smoke to draw.
         - screen: The screen to draw the smoke on.
+        - engine: The engine instance to handle rendering.
+        - layer (bool, optional): Whether `screen` is a layer made by `Engine.make_layer`. Defaults to False.
+        - particles (Optional[ParticleStore], optional): The particles to draw. Defaults to None (the smoke's).
+        - roi (Optional[Tuple[int, int, int, int]], optional): The (x, y, width, height) region to draw. Defaults to None (the whole screen).
         """
-        for particle in smoke.particles:
-            if particle.sprite_paint is None:
-                particle.default_particle_mask = smoke.default_particle_mask
-                if self.default_sprite is None:
-                    particle.sprite_paint = self.make_sprite(particle, engine)
-                else:
-                    particle.sprite_paint = self.default_sprite
-            self.draw_particle(particle, screen, engine)
+        particles = smoke.particles if particles is None else particles
+        visible = self.visible_particles(particles, engine, roi)
+        self.drawn_particles += len(visible)
+        self.culled_particles += int(
+            np.count_nonzero(particles.is_alive[: len(particles)])
+        ) - len(visible)
+        n = len(particles)
+        if self.default_sprite is None:
+            # Particles reference shared sprites, looked up again as their size changes
+            sizes = self.sprite_sizes(particles).tolist()
+            colors = particles.color[:n].astype(np.int64).tolist()
+            mask = particles.default_particle_mask
+            # Particles of a frame mostly share few sprites, look each one up once
+            sprites = {}
+            for index in visible.tolist():
+                key = (*colors[index], sizes[index])
+                sprite_paint = sprites.get(key)
+                if sprite_paint is None:
+                    sprite_paint = sprites[key] = self.cached_sprite(
+                        mask, tuple(colors[index]), sizes[index], engine
+                    )
+                particles.sprite_paint[index] = sprite_paint
+        else:
+            # Assign through a 1-element object array, an array sprite would be broadcast
+            fill = np.empty(1, dtype=object)
+            fill[0] = self.default_sprite
+            particles.sprite_paint[visible] = fill
+        # Same as `draw_particle` for every visible particle, read from the arrays at once
+        xs = particles.x[:n].astype(np.int64).tolist()
+        ys = particles.y[:n].astype(np.int64).tolist()
+        alphas = particles.alpha[:n].astype(np.int64).tolist()
+        sprite_paint = particles.sprite_paint
+        if engine.engine_type in (EngineTypes.PYGAME, EngineTypes.OPENCV):
+            # Draw cached copies with the alpha applied, the shared sprites are not modified
+            variants = {}
+            items = []
+            for index in visible.tolist():
+                sprite, alpha = sprite_paint[index], alphas[index]
+                key = (id(sprite), alpha)
+                variant = variants.get(key)
+                if variant is None:
+                    variant = variants[key] = self.alpha_sprite(sprite, alpha, engine)
+                items.append((variant, (xs[index], ys[index]), None))
+        else:
+            items = [
+                (sprite_paint[index], (xs[index], ys[index]), alphas[index])
+                for index in visible.tolist()
+            ]
+        engine.blits(screen, items, layer=layer)
+        # Mark the particles that left the screen as not alive, drawn or not
+        particles.cull(*engine.screen_dim)
+
+    def draw_splat(
+        self,
+        stores: List[ParticleStore],
+        screen,
+        engine: Engine,
+        layer: bool = False,
+        roi: Optional[Tuple[int, int, int, int]] = None,
+    ):
+        """
+        A method to draw particles with the density splat renderer. The visible particles of every
+        store are splatted into one `DensitySplat`, bucketed by mask and size (rounded to
+        `splat_quantum`), and the rendered grid is drawn as one image. Then the particles out of
+        the screen are marked as not alive, like `draw_smoke` does.
+
+        Args:
+        - stores (List[ParticleStore]): The particles of every smoke.
+        - screen: The screen to draw the particles on.
+        - engine: The engine instance to handle rendering.
+        - layer (bool, optional): Whether `screen` is a layer made by `Engine.make_layer`. Defaults to False.
+        - roi (Optional[Tuple[int, int, int, int]], optional): The (x, y, width, height) region to draw. Defaults to None (the whole screen).
+        """
+        splat = DensitySplat(engine.screen_dim)
+        for particles in stores:
+            visible = self.visible_particles(particles, engine, roi)
+            self.drawn_particles += len(visible)
+            self.culled_particles += int(
+                np.count_nonzero(particles.is_alive[: len(particles)])
+            ) - len(visible)
+            if len(visible):
+                sizes = self.sprite_sizes(particles)[visible]
+                quantum = self.splat_quantum
+                if quantum > 1:
+                    sizes = np.maximum(np.rint(sizes / quantum) * quantum, 1)
+                    sizes = sizes.astype(np.int64)
+                # Sprites are blitted at the truncated position
+                x = particles.x[visible].astype(np.int64)
+                y = particles.y[visible].astype(np.int64)
+                alpha = np.clip(particles.alpha[visible], 0, 255) / 255
+                color = particles.color[visible]
+                mask = particles.default_particle_mask
+                for size in np.unique(sizes).tolist():
+                    bucket = sizes == size
+                    splat.add(
+                        self.splat_kernel(mask, size),
+                        x[bucket],
+                        y[bucket],
+                        alpha[bucket],
+                        color[bucket],
+                    )
+            particles.cull(*engine.screen_dim)
+        if len(splat):
+            image = engine.paint_image(splat.render(self.extinction))
+            engine.blit(screen, image, (0, 0), layer=layer)
+
+
+class SmokeBatch:
+    def __init__(self, smoke_machine: SmokeMachine, random_seeds: Sequence[int]):
+        """
+        Independently seeded copies of a smoke machine (`SmokeMachine.copy`), simulated together.
+        The particles of every smoke of every copy live in one `ParticleStore`, tagged with the
+        index of their smoke in `batch`, so a step updates, compacts and culls them with one set
+        of array operations. Only the emissions are drawn per smoke, from the smoke's own seed.
+        Every copy ends up in the same state as if it was updated on its own.
+
+        Args:
+        - smoke_machine (SmokeMachine): The smoke machine to copy.
+        - random_seeds (Sequence[int]): The random seed of every copy.
+        """
+        self.machines = [smoke_machine.copy(random_seed=int(s)) for s in random_seeds]
+        self.particles = ParticleStore()
+        # The smokes of all copies, the batch index of a particle is its smoke's index here.
+        # Expired smokes are replaced by None.
+        self.smokes: List[Optional[Smoke]] = []
+        self.machine_smokes: List[List[int]] = []
+        for machine in self.machines:
+            indices = []
+            for smoke in machine.smokes:
+                indices.append(len(self.smokes))
+                self.particles.extend(smoke.particles, batch=len(self.smokes))
+                # The smoke's own store is not used anymore
+                smoke.particles.clear()
+                self.smokes.append(smoke)
+            self.machine_smokes.append(indices)
+        self.groups: Optional[List[np.ndarray]] = None
+
+    def __len__(self):
+        return len(self.machines)
+
+    def update(self, time_step: float = 30):
+        """
+        A method to update every copy, like `SmokeMachine.update`.
+
+        Args:
+        - time_step (float, optional): The time_step to update the copies by. Defaults to 30.
+        """
+        for machine in self.machines:
+            machine.time_step += time_step
+            machine.steps += 1
+        particles = self.particles
+        particles.update(time_step)
+        particles.compact()
+        n = len(particles)
+        pool_sizes = np.bincount(particles.batch[:n], minlength=len(self.smokes))
+        remove = np.zeros(len(self.smokes), dtype=bool)
+        drops, emissions = [], []
+        for index, smoke in enumerate(self.smokes):
+            if smoke is None:
+                continue
+            smoke.age += time_step
+            if smoke.lifetime > 0 and smoke.age > smoke.lifetime:
+                # Expired smokes are removed from their copy with their particles
+                remove[index] = True
+                self.smokes[index] = None
+                continue
+            count, drop = smoke.emission_plan(int(pool_sizes[index]))
+            if drop:
+                drops.append((index, drop))
+            emissions.append((index, smoke, count))
+        if remove.any() or drops:
+            particles.is_alive[:n] &= ~remove[particles.batch[:n]]
+            for index, drop in drops:
+                # The store is in spawn order, the first particles of a smoke are its oldest
+                oldest = np.flatnonzero(particles.batch[:n] == index)[:drop]
+                particles.is_alive[oldest] = False
+            particles.compact()
+        for machine, indices in zip(self.machines, self.machine_smokes):
+            machine.smokes = [
+                self.smokes[i] for i in indices if self.smokes[i] is not None
+            ]
+        for index, smoke, count in emissions:
+            x, y = smoke.origin
+            particles.spawn(
+                count,
+                x,
+                y,
+                smoke.particle_spec,
+                smoke.emission_generator(smoke.emissions),
+                batch=index,
+            )
+            smoke.particles_until_now += count
+            smoke.emissions += 1
+        self.groups = None
+
+    def cull(self, screen_dim: Tuple[int, int]) -> int:
+        """
+        A method to mark the particles that went out of the screen as not alive, like `SmokeMachine.cull`.
+
+        Args:
+        - screen_dim (Tuple[int, int]): The (width, height) of the screen.
+
+        Returns:
+        - int: The number of culled particles.
+        """
+        return self.particles.cull(*screen_dim)
+
+    def draw(self, index: int, screen, engine: Engine, layer: bool = False):
+        """
+        A method to draw one copy, like `SmokeMachine.draw`.
+
+        Args:
+        - index (int): The index of the copy.
+        - screen: The screen to draw the copy on.
+        - engine: The engine instance to handle rendering.
+        - layer (bool, optional): Whether `screen` is a layer made by `Engine.make_layer`. Defaults to False.
+        """
+        particles = self.particles
+        if self.groups is None:
+            # The particles of every smoke, in spawn order
+            n = len(particles)
+            order = np.argsort(particles.batch[:n], kind="stable")
+            counts = np.bincount(particles.batch[:n], minlength=len(self.smokes))
+            self.groups = np.split(order, np.cumsum(counts)[:-1])
+        machine = self.machines[index]
+        machine.drawn_particles = machine.culled_particles = 0
+        smokes = [i for i in self.machine_smokes[index] if self.smokes[i] is not None]
+        stores = []
+        for i in smokes:
+            store = particles.take(self.groups[i])
+            store.default_particle_mask = self.smokes[i].default_particle_mask
+            stores.append(store)
+        if machine.renderer == Renderer.SPLAT and machine.default_sprite is None:
+            machine.draw_splat(stores, screen, engine, layer=layer)
+        else:
+            for i, store in zip(smokes, stores):
+                machine.draw_smoke(
+                    self.smokes[i], screen, engine, layer=layer, particles=store
+                )
+        # Drawing culls the particles that left the screen
+        for i, store in zip(smokes, stores):
+            particles.is_alive[self.groups[i]] = store.is_alive[: len(store)]
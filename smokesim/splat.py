@@ -0,0 +1,143 @@
+"""
+Module to render particles as a density grid instead of drawing a sprite per particle.
+"""
+
+from enum import Enum
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+class Renderer(str, Enum):
+    SPRITES = "sprites"
+    SPLAT = "splat"
+
+
+class DensitySplat:
+    def __init__(self, screen_dim: Tuple[int, int]):
+        """
+        A density grid that particles are splatted into. Every particle adds its opacity and its
+        opacity weighted color at the top left corner of its sprite. Particles are bucketed by
+        kernel (their sprite mask at their quantized size), and every bucket is convolved once
+        with its kernel, so rendering costs O(pixels x buckets) instead of O(particles x sprite
+        area). Density is mapped to opacity with a Beer-Lambert transfer.
+
+        Args:
+        - screen_dim (Tuple[int, int]): The (width, height) of the grid.
+        """
+        self.screen_dim = tuple(screen_dim)
+        # id of the kernel -> (kernel, [x], [y], [weights])
+        self.buckets: Dict[int, Tuple[np.ndarray, List, List, List]] = {}
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def add(
+        self,
+        kernel: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+        alpha: np.ndarray,
+        color: np.ndarray,
+    ):
+        """
+        A method to splat particles that share a kernel.
+
+        Args:
+        - kernel (np.ndarray): The (size, size) float32 opacity of the sprite in [0, 1].
+        - x (np.ndarray): The int x of the top left corner of every sprite.
+        - y (np.ndarray): The int y of the top left corner of every sprite.
+        - alpha (np.ndarray): The opacity of every particle in [0, 1].
+        - color (np.ndarray): The (N, 3) RGB color of every particle.
+        """
+        width, height = self.screen_dim
+        kernel_height, kernel_width = kernel.shape
+        x = np.asarray(x, dtype=np.int64)
+        y = np.asarray(y, dtype=np.int64)
+        # Sprites that miss the grid add nothing
+        keep = (x > -kernel_width) & (x < width) & (y > -kernel_height) & (y < height)
+        weights = np.empty((np.count_nonzero(keep), 4), dtype=np.float64)
+        weights[:, 0] = np.asarray(alpha)[keep]
+        weights[:, 1:] = np.asarray(color)[keep] * weights[:, :1]
+        bucket = self.buckets.setdefault(id(kernel), (kernel, [], [], []))
+        bucket[1].append(x[keep])
+        bucket[2].append(y[keep])
+        bucket[3].append(weights)
+
+    def density(self) -> np.ndarray:
+        """
+        A method to convolve every bucket with its kernel.
+
+        Returns:
+        - np.ndarray: The (H, W, 4) float32 density and density weighted RGB color.
+        """
+        import cv2
+
+        width, height = self.screen_dim
+        density = np.zeros((height, width, 4), dtype=np.float32)
+        for kernel, xs, ys, weights in self.buckets.values():
+            x, y = np.concatenate(xs), np.concatenate(ys)
+            weights = np.concatenate(weights)
+            if not len(weights):
+                continue
+            kernel_height, kernel_width = kernel.shape
+            # Only convolve the box the sprites of the bucket cover. The box is padded on the top
+            # and left, so that sprites starting above or left of the screen are splatted too.
+            left, top = int(x.min()), int(y.min())
+            right = min(int(x.max()) + kernel_width, width)
+            bottom = min(int(y.max()) + kernel_height, height)
+            box_left, box_top = max(left, 0), max(top, 0)
+            grid_width = right - box_left + kernel_width - 1
+            grid_height = bottom - box_top + kernel_height - 1
+            index = (y - box_top + kernel_height - 1) * grid_width + (
+                x - box_left + kernel_width - 1
+            )
+            # Particles of a smoke mostly share a color, then only the density is convolved
+            colors = weights[:, 1:] / np.maximum(weights[:, :1], 1e-12)
+            color = colors[0] if np.ptp(colors, axis=0).max() < 1e-6 else None
+            channels = 4 if color is None else 1
+            grid = np.empty((grid_height * grid_width, channels), dtype=np.float32)
+            for channel in range(channels):
+                grid[:, channel] = np.bincount(
+                    index, weights[:, channel], minlength=len(grid)
+                )
+            # filter2D correlates, flip the kernel to spread every splat over its sprite.
+            # Large kernels are applied with a DFT.
+            grid = cv2.filter2D(
+                grid.reshape(grid_height, grid_width, channels),
+                -1,
+                np.ascontiguousarray(kernel[::-1, ::-1]),
+                anchor=(kernel_width - 1, kernel_height - 1),
+                borderType=cv2.BORDER_CONSTANT,
+            ).reshape(grid_height, grid_width, channels)
+            grid = grid[kernel_height - 1 :, kernel_width - 1 :]
+            region = density[box_top:bottom, box_left:right]
+            if color is None:
+                region += grid
+            else:
+                region[..., :1] += grid
+                region[..., 1:] += grid * color.astype(np.float32)
+        return density
+
+    def render(self, extinction: float = 1.0) -> np.ndarray:
+        """
+        A method to render the grid as an RGBA image. The opacity is
+        `1 - exp(-extinction * density)` and the color is the density weighted mean color.
+
+        Args:
+        - extinction (float, optional): How opaque a unit of density is. Defaults to 1.0.
+
+        Returns:
+        - np.ndarray: The (H, W, 4) uint8 RGBA image, not premultiplied.
+        """
+        density = self.density()
+        amount = density[..., 0]
+        # The DFT leaves tiny values where there is no smoke
+        covered = amount > 1e-6
+        rgba = np.zeros(density.shape, dtype=np.uint8)
+        rgba[covered, :3] = np.clip(
+            np.rint(density[covered, 1:] / amount[covered, None]), 0, 255
+        )
+        rgba[..., 3] = np.rint(
+            255 * -np.expm1(-extinction * np.maximum(amount, 0))
+        ).astype(np.uint8)
+        return rgba
@@ -0,0 +1,92 @@
+"""
+Module to share painted sprites between particles.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class SpriteCache:
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        """
+        A least recently used cache of painted sprites with a memory budget. Entries keep a
+        reference to the object their key was derived from (e.g. the opacity mask), so an `id`
+        in a key cannot be reused while the entry is cached.
+
+        Args:
+        - max_bytes (int, optional): The memory budget of the cached sprites. Defaults to 64 MiB.
+        """
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def get(self, key: Hashable) -> Optional[object]:
+        """
+        A method to get a cached sprite and mark it as recently used.
+
+        Args:
+        - key (Hashable): The key of the sprite.
+
+        Returns:
+        - Optional[object]: The sprite, or None if it is not cached.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, sprite: object, nbytes: int, owner: object = None):
+        """
+        A method to cache a sprite, evicting the least recently used ones to stay within budget.
+        A sprite larger than the whole budget is not cached.
+
+        Args:
+        - key (Hashable): The key of the sprite.
+        - sprite (object): The sprite.
+        - nbytes (int): The memory the sprite takes.
+        - owner (object, optional): An object kept alive with the entry. Defaults to None.
+        """
+        if key in self.entries:
+            self.nbytes -= self.entries.pop(key)[1]
+        if nbytes > self.max_bytes:
+            return
+        self.entries[key] = (sprite, nbytes, owner)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted_nbytes, _) = self.entries.popitem(last=False)
+            self.nbytes -= evicted_nbytes
+            self.evictions += 1
+
+    def clear(self):
+        """
+        A method to empty the cache. The counters are kept.
+        """
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        """
+        A method to get the counters of the cache.
+
+        Returns:
+        - dict: The hits, misses, evictions, entries and bytes.
+        """
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            entries=len(self.entries),
+            nbytes=self.nbytes,
+        )
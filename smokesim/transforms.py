@@ -0,0 +1,179 @@
+"""
+Module for a smoke transform that can be dropped into data loading pipelines.
+"""
+
+from smokesim.augmentation import Augmentation
+from smokesim.engine import EngineTypes
+from smokesim.mask_bank import MaskBank
+from smokesim.defs import SceneProperty
+from smokesim.smoke import SmokeMachine
+from smokesim.generate import render_sample, make_smoke_machine
+
+from typing import Optional, Tuple
+import os
+import sys
+import numpy as np
+import cv2
+
+
+class SmokeTransform:
+    def __init__(
+        self,
+        scene: Optional[SceneProperty] = None,
+        screen_dim: Optional[Tuple[int, int]] = None,
+        engine_type: EngineTypes = EngineTypes.PYGAME,
+        random_seed: int = 100,
+        mask_bank: Optional[MaskBank] = None,
+    ):
+        """
+        A picklable `(image) -> (image, mask)` transform. The engine and the smoke machine are
+        made lazily in the process that calls the transform and reused for every later call in
+        that process, so each data loader worker makes its own engine once and keeps its sprite
+        and Perlin mask caches across samples.
+
+        Every worker draws sample seeds from its own stream, derived from `random_seed`, the
+        worker id and the epoch. The worker id is taken from PyTorch's `get_worker_info` when
+        running in a PyTorch data loader, or set with `set_worker` (e.g. from a `worker_init_fn`).
+        In a PyTorch data loader the stream also follows the worker's seed, which changes every
+        epoch, so workers that are not persistent do not replay the same samples. Otherwise set
+        the epoch with `set_epoch`.
+
+        Args:
+        - scene (Optional[SceneProperty], optional): The scene parameters. Defaults to None (SceneProperty()).
+        - screen_dim (Optional[Tuple[int, int]], optional): The (width, height) smoke is rendered at. Defaults to None (the size of the first image).
+        - engine_type (EngineTypes, optional): The engine type. Defaults to EngineTypes.PYGAME.
+        - random_seed (int, optional): The seed the worker seed streams are derived from. Defaults to 100.
+        - mask_bank (Optional[MaskBank], optional): The bank to pick Perlin masks from. Defaults to None.
+        """
+        self.scene = scene if scene is not None else SceneProperty()
+        self.screen_dim = screen_dim
+        self.engine_type = engine_type
+        self.random_seed = random_seed
+        self.mask_bank = mask_bank
+        self.worker_id: Optional[int] = None
+        self.epoch = 0
+        self._reset()
+
+    def _reset(self):
+        """
+        Forget the per-process state, it is made again on the next call.
+        """
+        self.augmentation: Optional[Augmentation] = None
+        self.smoke_machine: Optional[SmokeMachine] = None
+        self.pid: Optional[int] = None
+        self.calls = 0
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.update(augmentation=None, smoke_machine=None, pid=None, calls=0)
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+
+    def set_worker(self, worker_id: int):
+        """
+        A method to set the worker id of the current process. It restarts the seed stream.
+
+        Args:
+        - worker_id (int): The worker id.
+        """
+        self.worker_id = int(worker_id)
+        self.calls = 0
+
+    def set_epoch(self, epoch: int):
+        """
+        A method to set the epoch. It restarts the seed stream.
+
+        Args:
+        - epoch (int): The epoch.
+        """
+        self.epoch = int(epoch)
+        self.calls = 0
+
+    def torch_worker_info(self):
+        """
+        A method to get the PyTorch worker info of the current process.
+
+        Returns:
+        - The worker info, or None outside of a PyTorch data loader worker.
+        """
+        # Only ask PyTorch if it is already in use, never import it here
+        if "torch" in sys.modules:
+            return sys.modules["torch"].utils.data.get_worker_info()
+        return None
+
+    def current_worker_id(self) -> int:
+        """
+        A method to get the worker id of the current process.
+
+        Returns:
+        - int: The id set with `set_worker`, else the PyTorch worker id, else 0.
+        """
+        if self.worker_id is not None:
+            return self.worker_id
+        worker_info = self.torch_worker_info()
+        if worker_info is not None:
+            return worker_info.id
+        return 0
+
+    def next_seed(self) -> int:
+        """
+        A method to draw the next sample seed of the current worker.
+
+        Returns:
+        - int: The seed.
+        """
+        entropy = [self.random_seed, self.current_worker_id(), self.epoch, self.calls]
+        worker_info = self.torch_worker_info()
+        if worker_info is not None:
+            # Drawn anew for every epoch, also for workers that are not persistent
+            entropy.append(worker_info.seed)
+        seed = np.random.SeedSequence(entropy).generate_state(1)[0]
+        self.calls += 1
+        return int(seed)
+
+    def setup(self, screen_dim: Tuple[int, int]):
+        """
+        A method to make the engine and the smoke machine of the current process.
+
+        Args:
+        - screen_dim (Tuple[int, int]): The (width, height) of the screen.
+        """
+        self.screen_dim = tuple(screen_dim)
+        self.augmentation = Augmentation(
+            image_path=None, screen_dim=self.screen_dim, engine_type=self.engine_type
+        )
+        if self.mask_bank is not None:
+            self.mask_bank.build()
+        self.smoke_machine = make_smoke_machine(self.engine_type, self.mask_bank)
+        self.pid = os.getpid()
+
+    def __call__(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A method to augment an image with smoke.
+
+        Args:
+        - image (np.ndarray): The (H, W, 3) uint8 RGB image.
+
+        Returns:
+        - np.ndarray: The smoke overlayed image, the size of `image`.
+        - np.ndarray: The smoke only image, the size of `image`.
+        """
+        image = np.asarray(image, dtype=np.uint8)
+        height, width = image.shape[:2]
+        if self.augmentation is None or self.pid != os.getpid():
+            self.setup(self.screen_dim or (width, height))
+
+        aug_image, aug_mask = render_sample(
+            self.augmentation,
+            image,
+            self.scene,
+            self.next_seed(),
+            mask_bank=self.mask_bank,
+            smoke_machine=self.smoke_machine,
+        )
+        if aug_image.shape[:2] != (height, width):
+            aug_image = cv2.resize(aug_image, (width, height))
+            aug_mask = cv2.resize(aug_mask, (width, height))
+        return aug_image, aug_mask
@@ -4,7 +4,6 @@ I first added it here: https://github.com/Crazz-Zaac/computer-vision-experiments
 """
 
 import numpy as np
-from matplotlib import pyplot as plt
 from typing import Tuple, List, Optional
 
 
@@ -30,6 +29,8 @@ def show_image(
     fig: Figure object.
 
     """
+    from matplotlib import pyplot as plt
+
     fig, ax = plt.subplots(figsize=fig_size)
     ax.imshow(image, vmax=255, vmin=0, cmap=cmap)
     if title:
@@ -83,6 +84,8 @@ def subplot_images(
         else (len(image) // order[1], order[1]) if order[0] == -1 else order
     )
 
+    from matplotlib import pyplot as plt
+
     fig, axs = plt.subplots(order[0], order[1], figsize=fig_size)
     if order[0] == 1 and order[1] == 1:
         axs = np.array([axs])
@@ -0,0 +1,192 @@
+from smokesim.engine import Engine, EngineTypes
+from smokesim.defs import Sprite
+from smokesim.defs.constants import CLOUD_MASK
+
+import cv2
+import numpy as np
+import pytest
+import subprocess
+import sys
+
+
+def sprite_to_array(engine: Engine, sprite_paint) -> np.ndarray:
+    """Helper function to read a painted sprite back as a (height, width, 4) array."""
+    if engine.engine_type == EngineTypes.PYGAME:
+        rgb = engine.engine.surfarray.array3d(sprite_paint).transpose(1, 0, 2)
+        alpha = engine.engine.surfarray.array_alpha(sprite_paint).T
+        return np.dstack([rgb, alpha])
+    return np.array(sprite_paint)
+
+
+@pytest.mark.parametrize("engine_type", [EngineTypes.PYGAME, EngineTypes.PIL])
+def test_paint_sprite(engine_type):
+    """Test that a painted sprite has the sprite's color and the resized mask as alpha."""
+    engine = Engine((100, 100), engine_type)
+    sprite = Sprite(width=37, height=23, opacity_mask=CLOUD_MASK, color=(24, 46, 48))
+
+    rgba = sprite_to_array(engine, engine.paint_sprite(sprite))
+
+    assert rgba.shape == (23, 37, 4)
+    assert np.all(rgba[..., :3] == (24, 46, 48))
+    expected = cv2.resize(CLOUD_MASK, (37, 23), interpolation=cv2.INTER_NEAREST)
+    assert np.array_equal(rgba[..., 3], expected)
+
+
+def test_numpy_blit():
+    """Test that the NumPy engine clips sprites to the screen and alpha blends them."""
+    engine = Engine((40, 30), EngineTypes.NUMPY)
+    screen = engine.make_screen((40, 30))
+    screen[...] = 100
+    sprite = engine.paint_sprite(
+        Sprite(width=20, height=20, opacity_mask=CLOUD_MASK, color=(200, 0, 50))
+    )
+
+    engine.blit(screen, sprite, (30, -5), alpha=128)
+
+    assert screen.shape == (30, 40, 3) and screen.dtype == np.float32
+    weight = sprite[5:, :10, 3:] * (128 / 255)
+    expected = 100 + (sprite[5:, :10, :3] - 100) * weight
+    assert np.allclose(screen[:15, 30:], expected)
+    assert np.all(screen[15:] == 100) and np.all(screen[:, :30] == 100)
+
+
+@pytest.mark.parametrize("engine_type", list(EngineTypes))
+def test_compose_orientation(engine_type):
+    """Test that frames come back in (H, W, 3) order with sprites where they were drawn."""
+    engine = Engine((90, 60), engine_type)
+    engine.read_image(None)
+    screen = engine.make_screen((90, 60))
+    layer = engine.make_layer()
+    sprite = engine.paint_sprite(
+        Sprite(width=10, height=10, opacity_mask=np.full((2, 2), 255, dtype=np.uint8))
+    )
+    engine.blit(layer, sprite, (70, 5), layer=True)
+
+    out = (np.empty((60, 90, 3), np.uint8), np.empty((60, 90, 3), np.uint8))
+    image, mask = engine.compose(screen, layer, engine.image, out=out)
+
+    assert image is out[0] and mask is out[1]
+    rows, cols = np.nonzero(mask.any(axis=-1))
+    assert (rows.min(), rows.max(), cols.min(), cols.max()) == (5, 14, 70, 79)
+    assert np.array_equal(image, mask)
+
+
+@pytest.mark.parametrize("layer", [False, True])
+def test_pygame_blits_with_alpha(layer):
+    """Batched pygame blits with per-image alpha match single blits and leave the sprite unchanged."""
+    engine = Engine((60, 40), EngineTypes.PYGAME, offscreen=True)
+    sprite = engine.paint_sprite(
+        Sprite(width=20, height=20, opacity_mask=CLOUD_MASK, color=(200, 0, 50))
+    )
+    before = sprite_to_array(engine, sprite)
+    items = [(sprite, (5, 3), 77), (sprite, (15, 10), 200), (sprite, (40, 30), 255)]
+
+    def new_screen():
+        screen = engine.make_layer() if layer else engine.make_screen((60, 40))
+        screen.fill((30, 60, 90, 40) if layer else (30, 60, 90))
+        return screen
+
+    expected = new_screen()
+    for image, pos, alpha in items:
+        copy = image.copy()
+        copy.set_alpha(alpha)
+        expected.blit(copy, pos)
+    screen = new_screen()
+    engine.blits(screen, items, layer=layer)
+
+    assert sprite.get_alpha() in (None, 255)
+    assert np.array_equal(sprite_to_array(engine, sprite), before)
+    assert np.array_equal(
+        sprite_to_array(engine, screen), sprite_to_array(engine, expected)
+    )
+
+
+def test_pil_layer_premultiplied():
+    """PIL layers composite premultiplied in place from cached bands, without changing the sprite."""
+    engine = Engine((40, 30), EngineTypes.PIL)
+    layer = engine.make_layer()
+    sprite = engine.paint_sprite(
+        Sprite(width=20, height=20, opacity_mask=CLOUD_MASK, color=(200, 0, 50))
+    )
+    before = np.array(sprite)
+
+    engine.blits(layer, [(sprite, (30, -5), None), (sprite, (25, 0), None)], layer=True)
+
+    assert engine.sprite_bands(sprite) is engine.sprite_bands(sprite)
+    assert len(engine.band_cache) == 1
+    assert np.array_equal(np.array(sprite), before)
+    expected = np.zeros((30, 40, 4))
+    for x, y in ((30, -5), (25, 0)):
+        region = expected[max(y, 0) : y + 20, x : x + 20]
+        src = before[max(-y, 0) : max(-y, 0) + region.shape[0], : region.shape[1]]
+        weight = src[..., 3:] / 255
+        region[..., :3] = src[..., :3] * weight + region[..., :3] * (1 - weight)
+        region[..., 3:] = src[..., 3:] + region[..., 3:] * (1 - weight)
+    assert np.abs(np.asarray(layer, dtype=float) - expected).max() <= 2
+    smoke, coverage = engine.read_layer(layer)
+    assert np.array_equal(smoke, np.asarray(layer, dtype=np.float32)[..., :3])
+
+
+def test_opencv_engine(tmp_path):
+    """The OpenCV engine reads images with OpenCV and draws premultiplied sprites with alpha like NumPy."""
+    image = np.random.default_rng(0).integers(0, 256, (30, 40, 3), dtype=np.uint8)
+    cv2.imwrite(
+        str(tmp_path / "background.png"), cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    )
+    engine = Engine((40, 30), EngineTypes.OPENCV)
+    engine.read_image(tmp_path / "background.png")
+    assert np.array_equal(engine.image, image)
+
+    numpy_engine = Engine((40, 30), EngineTypes.NUMPY)
+    sprite = Sprite(width=20, height=20, opacity_mask=CLOUD_MASK, color=(200, 0, 50))
+    layer, expected = engine.make_layer(), numpy_engine.make_layer()
+    engine.blits(layer, [(engine.paint_sprite(sprite), (30, -5), 128)], layer=True)
+    numpy_engine.blit(expected, numpy_engine.paint_sprite(sprite), (30, -5), alpha=128)
+
+    assert np.allclose(layer, expected, atol=1e-3)
+    image_out, mask_out = engine.compose(engine.make_screen((40, 30)), layer, image)
+    assert np.array_equal(mask_out, np.rint(expected[..., :3]).astype(np.uint8))
+    assert image_out.dtype == np.uint8 and image_out.shape == (30, 40, 3)
+
+
+@pytest.mark.parametrize("engine_type", [EngineTypes.NUMPY, EngineTypes.OPENCV])
+def test_tiled_blits(engine_type):
+    """Drawing tile by tile on threads is bit-identical to drawing sprite by sprite."""
+    rng = np.random.default_rng(0)
+    engine = Engine((90, 70), engine_type)
+    tiled_engine = Engine((90, 70), engine_type, threads=4, tile_size=16)
+    items = []
+    for size in rng.integers(3, 40, 60):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        sprite = Sprite(
+            width=int(size), height=int(size), opacity_mask=CLOUD_MASK, color=color
+        )
+        pos = tuple(int(p) for p in rng.integers(-30, 90, 2))
+        items.append((engine.paint_sprite(sprite), pos, int(rng.integers(1, 256))))
+
+    layer, tiled_layer = engine.make_layer(), tiled_engine.make_layer()
+    engine.blits(layer, items, layer=True)
+    tiled_engine.blits(tiled_layer, items, layer=True)
+    tiled_engine.end()
+
+    assert layer.any()
+    assert np.array_equal(layer, tiled_layer)
+
+
+def test_pygame_offscreen():
+    """The offscreen pygame engine never initializes pygame or opens a display, also in a fresh process."""
+    code = """
+import pygame
+from smokesim.augmentation import Augmentation
+from smokesim.defs import SmokeProperty
+
+augmentation = Augmentation(image_path=None, screen_dim=(60, 40))
+augmentation.add_smoke(SmokeProperty(particle_count=5, origin=(30, 30)))
+image, mask = augmentation.augment(steps=3)
+assert mask.any()
+print(pygame.get_init(), pygame.display.get_init())
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip().splitlines()[-1] == "False False"
@@ -0,0 +1,96 @@
+from smokesim.generate import generate, main, render_sample, make_smoke_machine
+from smokesim.augmentation import Augmentation
+from smokesim.defs import SceneProperty
+from smokesim.engine import EngineTypes
+
+import cv2
+import numpy as np
+
+
+def write_backgrounds(background_dir, count=2):
+    background_dir.mkdir()
+    random_state = np.random.default_rng(0)
+    for i in range(count):
+        image = random_state.integers(0, 256, (40, 60, 3), dtype=np.uint8)
+        cv2.imwrite(str(background_dir / f"{i}.png"), image)
+
+
+def test_render_sample_reuses_machine():
+    """A reused smoke machine renders like a fresh one and keeps its Perlin masks and sprites."""
+    scene = SceneProperty(steps=(2, 4), smoke_count=(1, 2), use_perlin_rate=1)
+    augmentation = Augmentation(
+        image_path=None, screen_dim=(60, 40), engine_type=EngineTypes.NUMPY
+    )
+    background = np.zeros((40, 60, 3), dtype=np.uint8)
+    smoke_machine = make_smoke_machine(EngineTypes.NUMPY)
+    masks = []
+    for seed in (1, 2, 1):
+        reused = render_sample(
+            augmentation, background, scene, seed, smoke_machine=smoke_machine
+        )
+        masks.append([smoke.default_particle_mask for smoke in smoke_machine.smokes])
+        fresh = render_sample(augmentation, background, scene, seed)
+        assert all(np.array_equal(a, b) for a, b in zip(reused, fresh))
+
+    # The third sample repeats the first one with the cached masks
+    assert len(masks[0]) > 0
+    assert all(a is b for a, b in zip(masks[0], masks[2]))
+    assert any(key[0] == "perlin" for key in smoke_machine.sprite_cache.entries)
+
+
+def test_generate_independent_of_workers(tmp_path):
+    """Samples only depend on the master seed and their index, not on the number of workers."""
+    write_backgrounds(tmp_path / "backgrounds")
+    scene = SceneProperty(steps=(2, 4), smoke_count=(1, 2), use_perlin_rate=0)
+    kwargs = dict(
+        count=4,
+        scene=scene,
+        screen_dim=(60, 40),
+        engine_type=EngineTypes.NUMPY,
+        master_seed=7,
+    )
+    generate(tmp_path / "backgrounds", out_dir=tmp_path / "serial", workers=1, **kwargs)
+    generate(tmp_path / "backgrounds", out_dir=tmp_path / "pool", workers=2, **kwargs)
+
+    for kind in ("images", "masks"):
+        names = sorted(p.name for p in (tmp_path / "serial" / kind).iterdir())
+        assert names == [f"{i:08d}.png" for i in range(4)]
+        for name in names:
+            serial = cv2.imread(str(tmp_path / "serial" / kind / name))
+            pool = cv2.imread(str(tmp_path / "pool" / kind / name))
+            assert serial.shape == (40, 60, 3)
+            assert np.array_equal(serial, pool)
+
+
+def test_generate_cli(tmp_path):
+    write_backgrounds(tmp_path / "backgrounds", count=1)
+    scene_path = tmp_path / "scene.json"
+    scene_path.write_text(
+        SceneProperty(steps=(1, 2), use_perlin_rate=0).model_dump_json()
+    )
+    main(
+        [
+            "--backgrounds",
+            str(tmp_path / "backgrounds"),
+            "--count",
+            "2",
+            "--out-dir",
+            str(tmp_path / "out"),
+            "--scene",
+            str(scene_path),
+            "--width",
+            "60",
+            "--height",
+            "40",
+            "--engine",
+            "numpy",
+            "--start",
+            "5",
+            "--workers",
+            "1",
+        ]
+    )
+    assert sorted(p.name for p in (tmp_path / "out" / "masks").iterdir()) == [
+        "00000005.png",
+        "00000006.png",
+    ]
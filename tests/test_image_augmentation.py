@@ -1,5 +1,6 @@
 from smokesim.augmentation import Augmentation
 from smokesim.defs import SmokeProperty, ParticleProperty
+from smokesim.engine import EngineTypes
 
 import logging
 import numpy as np
@@ -147,6 +148,128 @@ def test_augmentation():
     logging.info("PASSED.")
 
 
+@pytest.mark.parametrize("engine_type", list(EngineTypes))
+def test_single_pass_layer(engine_type):
+    """Over a black background the augmented image and the mask come from the same smoke layer."""
+    augmentation = Augmentation(
+        image_path=None, screen_dim=(120, 80), random_seed=3, engine_type=engine_type
+    )
+    augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(60, 60)))
+
+    final_image, final_mask = augmentation.augment(steps=5)
+
+    assert final_image.shape == final_mask.shape == (80, 120, 3)
+    assert final_mask.any(), "Smoke should be visible in the mask"
+    assert np.array_equal(final_image, final_mask)
+
+
+@pytest.mark.parametrize("engine_type", list(EngineTypes))
+def test_augment_batch(engine_type):
+    """A shared batch matches `augment` per image; independent simulations differ and are reproducible."""
+    images = np.random.default_rng(0).integers(0, 256, (4, 80, 120, 3), dtype=np.uint8)
+
+    def make_augmentation():
+        augmentation = Augmentation(
+            image_path=None,
+            screen_dim=(120, 80),
+            random_seed=3,
+            engine_type=engine_type,
+        )
+        augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(60, 60)))
+        return augmentation
+
+    batch_images, batch_masks = make_augmentation().augment_batch(images, steps=3)
+    final_image, final_mask = make_augmentation().augment(steps=3, image=images[2])
+    assert batch_images.shape == batch_masks.shape == images.shape
+    assert np.array_equal(batch_images[2], final_image)
+    assert np.array_equal(batch_masks[2], final_mask)
+
+    augmentation = make_augmentation()
+    _, masks = augmentation.augment_batch(images, steps=3, shared=False)
+    _, masks_again = augmentation.augment_batch(images, steps=3, shared=False)
+    assert masks.any()
+    assert not np.array_equal(masks[0], masks[1])
+    assert np.array_equal(masks, masks_again)
+
+
+@pytest.mark.parametrize("engine_type", list(EngineTypes))
+def test_render_every(engine_type):
+    """Simulating steps without rendering them gives the same final frame as rendering every step."""
+
+    def make_augmentation():
+        augmentation = Augmentation(
+            image_path=None,
+            screen_dim=(120, 80),
+            random_seed=3,
+            engine_type=engine_type,
+        )
+        augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(60, 60)))
+        augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(5, 5)))
+        return augmentation
+
+    frames = list(make_augmentation().augment_iter(steps=10, time_step=30))
+    sparse_frames = list(
+        make_augmentation().augment_iter(steps=10, time_step=30, render_every=4)
+    )
+    final_image, final_mask = make_augmentation().augment(steps=10)
+
+    assert len(frames) == 10 and len(sparse_frames) == 3
+    for i, (image, mask) in zip((3, 7, 9), sparse_frames):
+        assert np.array_equal(image, frames[i][0])
+        assert np.array_equal(mask, frames[i][1])
+    assert np.array_equal(final_image, frames[-1][0])
+    assert np.array_equal(final_mask, frames[-1][1])
+
+
+def test_render_at():
+    """A frame rendered in closed form matches the frame rendered after stepping."""
+
+    def make_augmentation():
+        augmentation = Augmentation(
+            image_path=None,
+            screen_dim=(120, 80),
+            random_seed=3,
+            engine_type=EngineTypes.NUMPY,
+        )
+        augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(60, 70)))
+        augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(5, 5)))
+        return augmentation
+
+    frames = list(make_augmentation().augment_iter(steps=60, time_step=30))
+    augmentation = make_augmentation()
+    for step in (60, 1, 25):
+        image, mask = augmentation.render_at(step, time_step=30)
+        assert np.array_equal(image, frames[step - 1][0])
+        assert np.array_equal(mask, frames[step - 1][1])
+
+
+def test_viewport_culling():
+    """Particles whose sprite misses the viewport or ROI are culled and counted, not drawn."""
+    augmentation = Augmentation(
+        image_path=None,
+        screen_dim=(120, 80),
+        random_seed=3,
+        engine_type=EngineTypes.NUMPY,
+    )
+    augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(100, 70)))
+    augmentation.add_smoke(SmokeProperty(particle_count=10, origin=(5, 5)))
+    smoke_machine = augmentation.smoke_machine
+    augmentation.advance(5, 30)
+    alive = sum(
+        np.count_nonzero(s.particles.is_alive[: len(s.particles)])
+        for s in smoke_machine.smokes
+    )
+
+    augmentation.render()
+    assert smoke_machine.drawn_particles + smoke_machine.culled_particles == alive
+
+    augmentation.advance(1, 30)
+    layer = augmentation.engine.make_layer()
+    smoke_machine.draw(layer, augmentation.engine, layer=True, roi=(0, 0, 20, 20))
+    assert 0 < smoke_machine.drawn_particles < alive
+    assert not layer[60:, 60:].any()
+
+
 if __name__ == "__main__":
     # Run the test with pytest for better integration
     logging.info("Starting test execution.")
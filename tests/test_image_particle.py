@@ -1,7 +1,10 @@
 from smokesim.augmentation import Augmentation
-from smokesim.defs import SmokeProperty, ParticleProperty
+from smokesim.defs import SmokeProperty, ParticleProperty, OverflowPolicy
+from smokesim.particle import Particle, ParticleStore
+from smokesim.smoke import Smoke, SmokeMachine, SmokeBatch
 
 import logging
+import numpy as np
 import pytest
 
 # Set up logging
@@ -29,16 +32,12 @@ def test_age():
 
     augmentation.augment(2, time_step=30)
     assert len(augmentation.smoke_machine.smokes) == 1
-    # after 1st step there will be 2 particles and increases by 1 each step
-    assert len(augmentation.smoke_machine.smokes[0].particles) == 3
-    # default time is 30 so first particle and second particle should be dead because of lifetime 10
-    assert not augmentation.smoke_machine.smokes[0].particles[0].is_alive
-    assert not augmentation.smoke_machine.smokes[0].particles[1].is_alive
-    # third particle should be alive because it is just created
-    assert augmentation.smoke_machine.smokes[0].particles[2].is_alive
-    # age of first particle should be 30 and second should be 30
-    assert augmentation.smoke_machine.smokes[0].particles[2].age == 0
-    assert augmentation.smoke_machine.smokes[0].particles[1].age == 30
+    # a particle is emitted every step but the ones older than their lifetime of 20
+    # are removed from the pool, so only the one emitted after the last update remains
+    assert len(augmentation.smoke_machine.smokes[0].particles) == 1
+    assert augmentation.smoke_machine.smokes[0].particles_until_now == 3
+    assert augmentation.smoke_machine.smokes[0].particles[0].is_alive
+    assert augmentation.smoke_machine.smokes[0].particles[0].age == 0
 
     logging.info("PASSED.")
 
@@ -64,6 +63,185 @@ def test_position():
     logging.info("PASSED.")
 
 
+@pytest.mark.parametrize(
+    "policy", [OverflowPolicy.DROP_OLDEST, OverflowPolicy.SKIP], ids=lambda p: p.value
+)
+def test_max_particles(policy):
+    WIDTH, HEIGHT = 100, 100
+
+    augmentation = Augmentation(
+        image_path=None, screen_dim=(WIDTH, HEIGHT), random_seed=42
+    )
+    augmentation.add_smoke(
+        smoke_property=SmokeProperty(
+            particle_count=4,
+            origin=(50, 90),
+            max_particles=10,
+            overflow_policy=policy,
+            particle_property=ParticleProperty(lifetime=100000, fade_speed=0),
+        )
+    )
+    smoke = augmentation.smoke_machine.smokes[0]
+    for _ in range(5):
+        augmentation.smoke_machine.update(time_step=1)
+        assert len(smoke.particles) <= 10
+    assert len(smoke.particles) == 10
+    if policy == OverflowPolicy.DROP_OLDEST:
+        # the newest emission always makes it into the pool
+        assert smoke.particles_until_now == 24
+        assert smoke.particles[-1].age == 0
+    else:
+        # emission stops once the pool is full
+        assert smoke.particles_until_now == 10
+        assert smoke.particles[-1].age > 0
+
+    logging.info("PASSED.")
+
+
+def test_store_matches_particle():
+    particles = [
+        Particle(
+            50, 50, ParticleProperty(random_seed=seed, min_lifetime=200, fade_speed=2)
+        )
+        for seed in range(20)
+    ]
+    store = ParticleStore(capacity=4)
+    store.add(particles)
+    assert len(store) == 20
+
+    for _ in range(10):
+        store.update(30)
+        for particle in particles:
+            particle.update(30)
+
+    for view, particle in zip(store, particles):
+        assert view.position == pytest.approx(particle.position)
+        assert (view.vx, view.vy) == pytest.approx((particle.vx, particle.vy))
+        assert view.alpha == particle.alpha
+        assert view.is_alive == particle.is_alive
+    assert np.any(~store.is_alive[: len(store)])
+
+    logging.info("PASSED.")
+
+
+def test_spawn_reproducible():
+    def spawn(seed):
+        smoke = Smoke(
+            SmokeProperty(particle_count=50, random_seed=seed, use_perlin_rate=0)
+        )
+        for _ in range(3):
+            smoke.update(30)
+        return smoke.particles
+
+    first, second, other = spawn(7), spawn(7), spawn(8)
+    assert len(first) == len(second) == 200
+    for name in ParticleStore.FIELDS:
+        assert np.array_equal(getattr(first, name)[:200], getattr(second, name)[:200])
+    assert not np.array_equal(first.startvx[:200], other.startvx[:200])
+
+    logging.info("PASSED.")
+
+
+def test_smoke_batch_matches_copies():
+    """Copies stepped together in a `SmokeBatch` end up like copies stepped on their own."""
+    smoke_machine = SmokeMachine(random_seed=3)
+    smoke_machine.add_smoke(SmokeProperty(particle_count=6, origin=(60, 60)))
+    smoke_machine.add_smoke(
+        SmokeProperty(
+            particle_count=5,
+            origin=(20, 70),
+            max_particles=12,
+            overflow_policy=OverflowPolicy.DROP_OLDEST,
+        )
+    )
+    smoke_machine.add_smoke(
+        SmokeProperty(particle_count=4, origin=(90, 75), max_particles=10)
+    )
+    smoke_machine.add_smoke(
+        SmokeProperty(particle_count=3, origin=(100, 40), lifetime=100)
+    )
+    seeds = [11, 12, 13]
+    batch = SmokeBatch(smoke_machine, seeds)
+    copies = [smoke_machine.copy(random_seed=seed) for seed in seeds]
+    for _ in range(8):
+        batch.update(30)
+        batch.cull((120, 80))
+        for copy in copies:
+            copy.update(30)
+            copy.cull((120, 80))
+
+    particles = batch.particles
+    n = len(particles)
+    for machine, copy in zip(batch.machines, copies):
+        assert len(machine.smokes) == len(copy.smokes) == 3
+        for smoke, expected in zip(machine.smokes, copy.smokes):
+            index = batch.smokes.index(smoke)
+            store = particles.take(np.flatnonzero(particles.batch[:n] == index))
+            expected = expected.particles
+            assert len(store) == len(expected) > 0
+            for name in ParticleStore.FIELDS + ("color", "is_alive"):
+                assert np.array_equal(
+                    getattr(store, name)[: len(store)],
+                    getattr(expected, name)[: len(expected)],
+                )
+
+
+def test_particle_spec():
+    """Particles spawn from a compiled spec and `add_smoke` only fills in fields that were not given."""
+    particle_property = ParticleProperty(lifetime=300, color=(1, 2, 3))
+    spec = particle_property.compile()
+    assert spec.lifetime == 300 and spec.color == (1, 2, 3)
+    with pytest.raises(AttributeError):
+        spec.lifetime = 10
+
+    smoke_machine = SmokeMachine(default_color=(9, 9, 9), default_particle_count=4)
+    smoke_machine.add_smoke(
+        SmokeProperty(color=(24, 46, 48), particle_property=particle_property)
+    )
+    smoke = smoke_machine.smokes[0]
+    assert smoke.color == (24, 46, 48)
+    assert smoke.particle_count == 4
+    assert smoke.particle_spec == spec
+    assert np.all(smoke.particles.lifetime[: len(smoke.particles)] == 300)
+
+    logging.info("PASSED.")
+
+
+def test_state_at_matches_simulation():
+    """The closed form state of a smoke matches stepping it, also with particles leaving the screen."""
+    smoke_property = SmokeProperty(
+        particle_count=6,
+        origin=(5, 40),
+        random_seed=11,
+        use_perlin_rate=0,
+        particle_property=ParticleProperty(
+            min_vx=-1, max_vx=1, min_lifetime=200, max_lifetime=3000, fade_speed=2
+        ),
+    )
+    stepped = Smoke(smoke_property.model_copy(deep=True))
+    closed_form = Smoke(smoke_property.model_copy(deep=True))
+    for step in range(1, 151):
+        stepped.update(30)
+        if step in (1, 2, 40, 150):
+            particles = closed_form.state_at(step, 30, screen_dim=(100, 50))
+            particles.cull(100, 50)
+            particles.compact()
+        stepped.particles.cull(100, 50)
+        if step in (1, 2, 40, 150):
+            alive = stepped.particles.is_alive[: len(stepped.particles)]
+            assert len(particles) == np.count_nonzero(alive)
+            for name in ("x", "y", "vx", "vy", "age", "alpha", "scale"):
+                expected = getattr(stepped.particles, name)[: len(alive)][alive]
+                assert getattr(particles, name)[: len(particles)] == pytest.approx(
+                    expected
+                )
+
+    with pytest.raises(ValueError):
+        Smoke(SmokeProperty(max_particles=10, use_perlin_rate=0)).state_at(3)
+
+    logging.info("PASSED.")
+
+
 if __name__ == "__main__":
     # Run the test with pytest for better integration
     logging.info("Starting test execution.")
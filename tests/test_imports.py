@@ -0,0 +1,28 @@
+import json
+import subprocess
+import sys
+import pytest
+
+HEAVY_MODULES = ("cv2", "PIL", "pygame", "matplotlib")
+# Seconds, generous enough for slow CI machines. numpy and pydantic take most of it.
+IMPORT_BUDGET = 1.5
+
+
+@pytest.mark.parametrize(
+    "module", ["smokesim.smoke", "smokesim.augmentation", "smokesim.vis"]
+)
+def test_import_is_lazy(module):
+    """Importing smokesim stays within budget and does not import any rendering backend."""
+    code = f"""
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps(dict(elapsed=elapsed, heavy=[m for m in {HEAVY_MODULES!r} if m in sys.modules])))
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    assert report["heavy"] == []
+    assert report["elapsed"] < IMPORT_BUDGET
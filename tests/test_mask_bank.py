@@ -0,0 +1,94 @@
+import json
+import pickle
+import numpy as np
+import pytest
+from smokesim.mask_bank import MaskBank
+from smokesim.smoke import Smoke
+from smokesim.defs import SmokeProperty
+
+
+def make_bank(cache_dir, **kwargs):
+    params = dict(size=16, count=6, cache_dir=cache_dir, max_workers=2)
+    params.update(kwargs)
+    return MaskBank(**params)
+
+
+def test_bank_is_generated_once_and_reloaded(tmp_path):
+    """Test that a bank is written to disk once and read back with the same masks."""
+    bank = make_bank(tmp_path).build()
+
+    assert bank.path.exists() and bank.index_path.exists()
+    assert bank.masks.shape == (6, 16, 16) and bank.masks.dtype == np.uint8
+
+    mtime = bank.path.stat().st_mtime_ns
+    reloaded = make_bank(tmp_path).build()
+    assert reloaded.path.stat().st_mtime_ns == mtime
+    assert np.array_equal(np.asarray(bank.masks), np.asarray(reloaded.masks))
+
+    serial = make_bank(tmp_path / "serial", max_workers=1).build()
+    assert np.array_equal(np.asarray(bank.masks), np.asarray(serial.masks))
+
+
+def test_bank_is_regenerated_when_invalid(tmp_path):
+    """Test that a truncated bank or a bank with a mismatched index is generated again."""
+    bank = make_bank(tmp_path).build()
+    masks = np.array(bank.masks)
+    del bank
+
+    with open(make_bank(tmp_path).path, "r+b") as f:
+        f.truncate(200)
+    bank = make_bank(tmp_path).build()
+    assert np.array_equal(np.asarray(bank.masks), masks)
+    del bank
+
+    index_path = make_bank(tmp_path).index_path
+    index = json.loads(index_path.read_text())
+    index_path.write_text(json.dumps(dict(index, key="0" * 16)))
+    bank = make_bank(tmp_path)
+    assert bank.load() is None
+    bank.build()
+    assert json.loads(index_path.read_text())["key"] == bank.key
+    assert np.array_equal(np.asarray(bank.masks), masks)
+
+
+def test_bank_key_covers_parameters(tmp_path):
+    """Test that changing any generation parameter changes the cache key."""
+    key = make_bank(tmp_path).key
+    assert make_bank(tmp_path).key == key
+    assert make_bank(tmp_path, octaves=(1, 3)).key != key
+    assert make_bank(tmp_path, falloff=2.0).key != key
+    assert make_bank(tmp_path, random_seed=1).key != key
+
+
+def test_bank_pick_and_lru(tmp_path):
+    """Test that picking is deterministic and the in-memory copies stay bounded."""
+    bank = make_bank(tmp_path, max_in_memory=2).build()
+
+    assert np.array_equal(bank.pick(123), bank.pick(123))
+    for index in range(len(bank)):
+        bank.get(index)
+    assert list(bank.cache) == [4, 5]
+
+
+def test_bank_pickles_without_masks(tmp_path):
+    """Test that a built bank is sent to other processes without its masks."""
+    bank = make_bank(tmp_path, count=64, size=32).build()
+    bank.get(0)
+    data = pickle.dumps(bank)
+    assert len(data) < bank.masks.nbytes
+
+    unpickled = pickle.loads(data)
+    assert unpickled.masks is None and len(unpickled.cache) == 0
+    assert np.array_equal(unpickled.get(5), bank.get(5))
+    assert isinstance(unpickled.masks, np.memmap)
+
+
+def test_smoke_uses_bank(tmp_path):
+    """Test that a smoke takes its Perlin mask from the bank."""
+    bank = make_bank(tmp_path).build()
+    smoke = Smoke(SmokeProperty(id=3, use_perlin_rate=1), mask_bank=bank)
+
+    assert any(
+        np.array_equal(smoke.default_particle_mask, bank.masks[i])
+        for i in range(len(bank))
+    )
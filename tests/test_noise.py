@@ -1,6 +1,6 @@
 import pytest
 import numpy as np
-from smokesim.noise import PerlinNoise
+from smokesim.noise import PerlinNoise, FalloffProfile
 
 
 def test_2d_noise_randomness():
@@ -25,6 +25,15 @@ def test_3d_noise_randomness():
     assert value1 != value2, "3D noise values should differ with different seeds"
 
 
+def test_seed_zero_is_deterministic():
+    """Seed 0 is a seed like any other, not a request for a random one."""
+    mask1 = PerlinNoise(seed=0).generate_cloud_mask(width=16, height=16, scale=16)
+    mask2 = PerlinNoise(seed=0).generate_cloud_mask(width=16, height=16, scale=16)
+
+    assert PerlinNoise(seed=0).seed == 0
+    assert np.array_equal(mask1, mask2), "Seed 0 should give the same mask every time"
+
+
 def test_fractal_noise_2d():
     """Test that fractal noise works for 2D."""
     noise = PerlinNoise(
@@ -94,3 +103,32 @@ def test_generate_cloud_mask_random_state():
     assert not np.array_equal(
         cloud_mask_1, cloud_mask_2
     ), "Cloud masks should differ with different random states"
+
+
+@pytest.mark.parametrize("use_z", [False, True])
+def test_noise_arrays_match_scalars(use_z):
+    """Test that evaluating a whole grid gives the same values as evaluating point by point."""
+    noise = PerlinNoise(seed=42, octaves=3, persistence=0.5, lacunarity=2.0)
+    y, x = np.mgrid[0:6, 0:7] / 2.3
+    z = np.full(x.shape, 0.7) if use_z else None
+
+    grid = noise.fractal_noise(x, y, z)
+
+    assert grid.shape == x.shape
+    for (i, j), value in np.ndenumerate(grid):
+        expected = noise.fractal_noise(x[i, j], y[i, j], None if z is None else z[i, j])
+        assert value == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "profile", [FalloffProfile.RADIAL, FalloffProfile.ELLIPTICAL, lambda d: 1 - d]
+)
+def test_generate_cloud_mask_falloff_profile(profile):
+    """Test that every falloff profile fades the mask towards its edges."""
+    noise = PerlinNoise(seed=42, falloff_profile=profile)
+
+    cloud_mask = noise.generate_cloud_mask(width=64, height=32, scale=16)
+
+    assert cloud_mask.shape == (32, 64) and cloud_mask.dtype == np.uint8
+    assert cloud_mask[0, 0] == 5, "Corners should only keep the base opacity"
+    assert cloud_mask[12:20, 28:36].mean() > cloud_mask[:4, :4].mean()
@@ -0,0 +1,65 @@
+from smokesim.splat import DensitySplat, Renderer
+from smokesim.smoke import SmokeMachine
+from smokesim.augmentation import Augmentation
+from smokesim.engine import EngineTypes
+from smokesim.defs import SmokeProperty
+
+import numpy as np
+import pytest
+
+
+def test_splat_matches_sprites():
+    """Splatted particles cover their sprite rectangle, also when it is clipped or large enough for a DFT."""
+    rng = np.random.default_rng(0)
+    for kernel_size in (5, 40):
+        kernel = rng.random((kernel_size, kernel_size)).astype(np.float32)
+        x, y = rng.integers(-45, 60, 20), rng.integers(-45, 40, 20)
+        alpha, color = rng.random(20), rng.integers(0, 256, (20, 3))
+        for uniform in (False, True):
+            colors = np.repeat(color[:1], 20, axis=0) if uniform else color
+            splat = DensitySplat((60, 40))
+            splat.add(kernel, x, y, alpha, colors)
+
+            expected = np.zeros((140, 160, 4))
+            for i in range(20):
+                expected[
+                    50 + y[i] : 50 + y[i] + kernel_size,
+                    50 + x[i] : 50 + x[i] + kernel_size,
+                ] += (
+                    kernel[..., None] * alpha[i] * np.r_[1, colors[i]]
+                )
+            expected = expected[50:90, 50:110]
+            assert np.allclose(splat.density(), expected, atol=1e-3)
+
+    rgba = splat.render(extinction=2.0)
+    amount = expected[..., 0]
+    opacity = 255 * (1 - np.exp(-2 * amount))
+    assert np.abs(rgba[..., 3] - opacity).max() <= 0.5 + 1e-3
+    assert np.all(rgba[amount > 1e-3, :3] == color[0])
+
+
+@pytest.mark.parametrize("engine_type", list(EngineTypes))
+def test_machine_splat(engine_type):
+    """The splat renderer draws the same particles as sprites do, with a close result."""
+    masks, drawn = [], []
+    for renderer in Renderer:
+        smoke_machine = SmokeMachine(
+            engine_type=engine_type, renderer=renderer, random_seed=3
+        )
+        augmentation = Augmentation(
+            image_path=None,
+            screen_dim=(120, 90),
+            engine_type=engine_type,
+            smoke_machine=smoke_machine,
+        )
+        augmentation.add_smoke(
+            SmokeProperty(particle_count=20, origin=(60, 80), sprite_size=16)
+        )
+        _, mask = augmentation.augment(steps=6)
+        augmentation.end()
+        masks.append(mask.astype(float))
+        drawn.append(smoke_machine.drawn_particles)
+
+    assert drawn[0] == drawn[1] > 0
+    assert masks[1].any()
+    assert np.abs(masks[0] - masks[1]).mean() < 2
@@ -0,0 +1,96 @@
+from smokesim.sprite_cache import SpriteCache
+from smokesim.smoke import SmokeMachine
+from smokesim.engine import Engine, EngineTypes, resize_nearest
+from smokesim.defs import Sprite, SmokeProperty, ParticleProperty
+from smokesim.defs.constants import CLOUD_MASK
+
+import numpy as np
+import pytest
+
+
+def test_lru_and_budget():
+    cache = SpriteCache(max_bytes=100)
+    cache.put("a", "A", 40)
+    cache.put("b", "B", 40)
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.put("c", "C", 40)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.get("b") is None
+    cache.put("huge", "H", 1000)
+    assert "huge" not in cache
+    assert cache.stats() == dict(hits=1, misses=1, evictions=1, entries=2, nbytes=80)
+
+
+def test_machine_shares_sprites():
+    """Particles share cached sprites painted with their smoke's mask and current size."""
+    engine = Engine((120, 80), EngineTypes.NUMPY)
+    layer = engine.make_layer()
+    smoke_machine = SmokeMachine(engine_type=EngineTypes.NUMPY, random_seed=3)
+    smoke_machine.add_smoke(
+        SmokeProperty(
+            particle_count=10,
+            origin=(60, 70),
+            use_perlin_rate=1,
+            particle_property=ParticleProperty(min_scale=20, max_scale=22),
+        )
+    )
+    smoke = smoke_machine.smokes[0]
+    for _ in range(5):
+        smoke_machine.update(30)
+        smoke_machine.draw(layer, engine, layer=True)
+
+    cache = smoke_machine.sprite_cache
+    assert cache.hits > 0 and 0 < cache.misses == len(cache)
+    particles = smoke.particles
+    sizes = smoke_machine.sprite_sizes(particles)
+    for index in range(len(particles)):
+        if particles.is_alive[index]:
+            sprite = particles.sprite_paint[index]
+            assert sprite.shape[:2] == (sizes[index], sizes[index])
+            expected = resize_nearest(smoke.default_particle_mask, (sizes[index],) * 2)
+            assert np.array_equal(sprite[..., 3], expected / np.float32(255))
+    # Sprites follow the size, which changes with age
+    expected_sizes = particles.scale + particles.age * particles.scale_step
+    assert np.array_equal(
+        sizes, np.maximum(np.floor(expected_sizes[: len(particles)]), 1)
+    )
+
+
+@pytest.mark.parametrize("engine_type", list(EngineTypes))
+def test_machine_default_sprite(engine_type):
+    """Every visible particle draws the machine's `default_sprite` when it is set."""
+    engine = Engine((120, 80), engine_type, offscreen=True)
+    layer = engine.make_layer()
+    smoke_machine = SmokeMachine(engine_type=engine_type, random_seed=3)
+    smoke_machine.default_sprite = engine.paint_sprite(
+        Sprite(width=10, height=10, opacity_mask=CLOUD_MASK, color=(200, 0, 50))
+    )
+    smoke_machine.add_smoke(SmokeProperty(particle_count=10, origin=(60, 70)))
+    for _ in range(3):
+        smoke_machine.update(30)
+        smoke_machine.draw(layer, engine, layer=True)
+
+    particles = smoke_machine.smokes[0].particles
+    assert smoke_machine.drawn_particles > 0
+    # No sprites are painted, only alpha variants of the default one are cached
+    assert all(key[1] == "alpha" for key in smoke_machine.sprite_cache.entries)
+    for index in range(len(particles)):
+        if particles.is_alive[index]:
+            assert particles.sprite_paint[index] is smoke_machine.default_sprite
+    assert engine.read_layer(layer)[1].any()
+    engine.end()
+
+
+def test_make_sprite_uses_particle_mask():
+    """`make_sprite` paints the particle's own mask, not the default cloud mask."""
+    engine = Engine((120, 80), EngineTypes.NUMPY)
+    smoke_machine = SmokeMachine(engine_type=EngineTypes.NUMPY, random_seed=3)
+    smoke_machine.add_smoke(
+        SmokeProperty(particle_count=4, origin=(60, 70), use_perlin_rate=1)
+    )
+    smoke = smoke_machine.smokes[0]
+    assert not np.array_equal(smoke.default_particle_mask, CLOUD_MASK)
+    particle = smoke.particles[0]
+    sprite = smoke_machine.make_sprite(particle, engine, size=16)
+    expected = resize_nearest(smoke.default_particle_mask, (16, 16))
+    assert np.array_equal(sprite[..., 3], expected / np.float32(255))